@@ -1,11 +1,16 @@
 import os
 import sqlite3
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
-from duplicate_detection.hash import hash_file_complet, hash_file_fast
-from duplicate_detection.utiles import get_file_suffix_category
+from duplicate_detection.hash import hash_file_complet, hash_file_fast, hash_files_tiered
+from duplicate_detection.utiles import get_file_suffix_category, scan_files_concurrent
+
+# 视频文件后缀（模块加载时构建一次）
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp')
+# 多线程模式下每完成多少个文件更新一次进度条
+PBAR_BATCH = 100
 
 
 def save_1file(file_info, conn):
@@ -20,60 +25,57 @@ def save_1file(file_info, conn):
     """
     sha256 = file_info['sha256']
 
-    try:
-        # 尝试插入主表
-        cursor = conn.execute('''
-            INSERT INTO files (sha256, filename, filepath, filesize, category, suffix, location_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (sha256, file_info['filename'], file_info['filepath'], file_info['filesize'], file_info['category'], file_info['suffix'], file_info['location']))
+    # 尝试插入主表，sha256冲突时忽略插入（不抛出异常），通过rowcount判断是否为新文件
+    cursor = conn.execute('''
+        INSERT OR IGNORE INTO files (sha256, filename, filepath, filesize, category, suffix, location_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (sha256, file_info['filename'], file_info['filepath'], file_info['filesize'], file_info['category'], file_info['suffix'], file_info['location']))
 
+    if cursor.rowcount == 1:
         file_id = cursor.lastrowid
         conn.commit()
         return {'status': 'unique', 'file_id': file_id}
 
-    except sqlite3.IntegrityError as e:
-        if "UNIQUE constraint failed: files.sha256" in str(e):
-            # 获取已存在的详细信息进行对比
-            original_details = conn.execute(
-                'SELECT id, filepath, filesize FROM files WHERE sha256 = ?',
-                (sha256,)
-            ).fetchone()
-
-            if original_details:
-                # 检查文件路径和大小是否完全相同
-                if (original_details
-                        and original_details[1] == file_info['filepath']
-                        and original_details[2] == file_info['filesize']):
-                    # 完全相同的文件，跳过插入
-                    conn.commit()
-                    return {'status': 'skip', 'reason': 'identical_to_original', 'original_id': original_details[0]}
-                else:
-                    # 检查duplicates表中是否已存在相同路径和大小的重复记录
-                    existing_duplicate = conn.execute(
-                        '''SELECT id FROM duplicates 
-                           WHERE sha256 = ? AND filepath = ?'''
-                        , (sha256, file_info['filepath'])
-                    ).fetchone()
-
-                    if existing_duplicate:
-                        # 重复表中已存在相同路径的记录，跳过插入
-                        conn.commit()
-                        return {'status': 'skip', 'reason': 'duplicate_already_exists',
-                                'duplicate_id': existing_duplicate[0]}
-                    else:
-                        # 插入副表（不同路径的相同内容文件）
-                        conn.execute('''
-                            INSERT INTO duplicates 
-                            (original_id, sha256, filename, filepath, filesize, location_id)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        ''', (original_details[0], sha256, file_info['filename'], file_info['filepath'], file_info['filesize'], file_info['location']))
-
-                        conn.commit()
-                        return {'status': 'duplicate', 'original_file_id': original_details[0]}
+    # 获取已存在的详细信息进行对比
+    original_details = conn.execute(
+        'SELECT id, filepath, filesize FROM files WHERE sha256 = ? LIMIT 1',
+        (sha256,)
+    ).fetchone()
 
-        # 其他错误重新抛出
+    if original_details is None:
+        # 不是sha256冲突导致的忽略（其他约束失败），按错误处理
         conn.rollback()
-        raise e
+        raise sqlite3.IntegrityError(f"插入 files 失败（非sha256冲突）: {file_info['filepath']}")
+
+    # 检查文件路径和大小是否完全相同
+    if original_details[1] == file_info['filepath'] and original_details[2] == file_info['filesize']:
+        # 完全相同的文件，跳过插入
+        conn.commit()
+        return {'status': 'skip', 'reason': 'identical_to_original', 'original_id': original_details[0]}
+
+    # 检查duplicates表中是否已存在相同路径和大小的重复记录
+    existing_duplicate = conn.execute(
+        '''SELECT id FROM duplicates 
+           WHERE sha256 = ? AND filepath = ? LIMIT 1'''
+        , (sha256, file_info['filepath'])
+    ).fetchone()
+
+    if existing_duplicate:
+        # 重复表中已存在相同路径的记录，跳过插入
+        conn.commit()
+        return {'status': 'skip', 'reason': 'duplicate_already_exists',
+                'duplicate_id': existing_duplicate[0]}
+
+    # 插入副表（不同路径的相同内容文件）
+    conn.execute('''
+        INSERT INTO duplicates 
+        (original_id, sha256, filename, filepath, filesize, location_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (original_details[0], sha256, file_info['filename'], file_info['filepath'], file_info['filesize'], file_info['location']))
+
+    conn.commit()
+    return {'status': 'duplicate', 'original_file_id': original_details[0]}
+
 
 def add_files2database(
         db_path,
@@ -92,13 +94,15 @@ def add_files2database(
     :param pre_target_dir: 针对每个系统而不同的路径
     :param num_threads: 线程数（None=使用默认线程池线程数）
     :param use_multithreading: 是否使用多线程
-    :param hash_type: 计算的hash类型
+    :param hash_type: 计算的hash类型 ('fast', 'complet', 'tiered': 先快速哈希分组，仅对冲突文件计算完整哈希)
     :param location: 文件的位置标注
     """
     target_dir = os.path.normpath(target_dir)
     pre_target_dir = os.path.normpath(pre_target_dir)
     # 线程本地存储，每个线程有自己的数据库连接
     thread_local = threading.local()
+    # hash_type='tiered' 时预先计算的哈希值 {文件路径: 哈希值}
+    tiered_hashes = {}
 
     def get_thread_connection():
         """获取或创建线程专用的数据库连接"""
@@ -115,17 +119,18 @@ def add_files2database(
 
     def is_video_file(filename):
         """检查是否为视频文件"""
-        video_extensions = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp'}
-        return os.path.splitext(filename)[1].lower() in video_extensions
+        return filename.lower().endswith(VIDEO_EXTENSIONS)
 
-    def calculate_sha256(file_path):
+    def calculate_sha256(file_path, file_size=None):
         """计算文件的SHA256哈希值"""
         try:
             sha256 = 'hash_x'
             if hash_type == 'complet':
-                sha256 = hash_file_complet(file_path)
+                sha256 = hash_file_complet(file_path, file_size=file_size)
             elif hash_type == 'fast':
                 sha256 = hash_file_fast(file_path)
+            elif hash_type == 'tiered':
+                sha256 = tiered_hashes.get(file_path)
             return sha256
         except Exception as e:
             print(f"计算哈希值时出错 {file_path}: {e}")
@@ -135,13 +140,15 @@ def add_files2database(
         """处理单个文件并插入数据库，支持SHA256去重"""
         root, filename, suffix, category = file_info
         file_path = os.path.join(root, filename)
+        # 完整路径只拼接一次，供获取大小和计算哈希共用
+        abs_path = os.path.join(pre_target_dir, file_path)
 
         try:
             # 获取文件大小
-            file_size = os.path.getsize(os.path.join(pre_target_dir, file_path))
+            file_size = os.path.getsize(abs_path)
 
             # 计算SHA256哈希
-            sha256_hash = calculate_sha256(os.path.join(pre_target_dir, file_path))
+            sha256_hash = calculate_sha256(abs_path, file_size)
             if sha256_hash is None:
                 return {'status': 'error', 'reason': 'hash_failed'}
 
@@ -170,42 +177,110 @@ def add_files2database(
                 pass
             return {'status': 'error', 'reason': str(e)}
 
-    def count_valid_files(directory):
-        """统计有效的文件数量"""
-        total_files = 0
-        for root, dirs, files in os.walk(directory):
-            # 过滤掉隐藏的目录
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            # 统计文件
-            total_files += len([f for f in files if not f.startswith('.')])
-        return total_files
-
     def get_all_files_infos(directory):
-        """获取所有文件路径等信息"""
+        """并发遍历目录，获取所有文件路径等信息"""
         path_files = []
-        for root, dirs, files in os.walk(directory):
-            # 过滤掉包含@的目录和隐藏目录
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            for file in files:
-                if not file.startswith('.'):
-                    suffix, category = get_file_suffix_category(file)
-                    torecord = os.path.join(os.sep, root)
-                    torecord = os.path.relpath(torecord, os.path.join(os.sep, pre_target_dir))
-                    path_files.append((torecord, file, suffix, category))
+        base = os.path.join(os.sep, pre_target_dir)
+        # 同一目录下的文件共用相对路径，每个目录只计算一次
+        torecords = {}
+        for root, file in scan_files_concurrent(directory, max_workers=num_threads or 8):
+            torecord = torecords.get(root)
+            if torecord is None:
+                torecord = torecords[root] = os.path.relpath(os.path.join(os.sep, root), base)
+            path_files.append((torecord, file) + get_file_suffix_category(file))
         return path_files
 
+    def tiered_prefilter(abs_paths):
+        """
+        两级哈希预筛选，并与数据库中已有记录比对（快速哈希只在本批次内唯一还不够）：
+        - 快速哈希与已有的 'FAST:' 记录相同：新文件和已入库文件都计算完整哈希，已入库记录改存完整哈希
+        - 已有完整哈希记录的文件大小与新文件相同：新文件计算完整哈希，才能与之匹配
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            # {快速哈希: (记录id, 相对路径)}，以及以完整哈希入库的文件大小
+            fast_rows = {sha256[len('FAST:'):]: (row_id, filepath) for row_id, filepath, sha256 in conn.execute(
+                "SELECT id, filepath, sha256 FROM files WHERE sha256 LIKE 'FAST:%'")}
+            complet_sizes = {size for (size,) in conn.execute(
+                "SELECT DISTINCT filesize FROM files WHERE sha256 NOT LIKE 'FAST:%'")}
+
+            # 快速哈希命中的已入库记录 {记录id: (已入库文件的完整路径, 命中的新文件路径)}
+            matched_rows = {}
+
+            def force_complet(path, fast_hash):
+                row = fast_rows.get(fast_hash)
+                if row is not None:
+                    matched_rows[row[0]] = (os.path.join(pre_target_dir, row[1]), path)
+                    return True
+                try:
+                    return os.path.getsize(path) in complet_sizes
+                except OSError:
+                    return False
+
+            hashes = hash_files_tiered(abs_paths, num_threads=num_threads, force_complet=force_complet)
+
+            def stored_complet_hash(item):
+                """已入库文件的完整哈希；与新文件是同一路径时直接沿用刚算出的结果"""
+                stored_path, new_path = item
+                if stored_path == new_path and hashes.get(new_path) is not None:
+                    return hashes[new_path]
+                try:
+                    return hash_file_complet(stored_path)
+                except OSError as e:
+                    # 其他位置的文件或已被移走，无法校验，保持原记录不变
+                    print(f"无法计算已入库文件的完整哈希 {stored_path}: {e}")
+                    return None
+
+            if matched_rows:
+                print(f"快速哈希与数据库已有记录冲突的文件: {len(matched_rows)}")
+                with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                    stored_hashes = list(executor.map(stored_complet_hash, matched_rows.values()))
+                for row_id, sha256 in zip(matched_rows, stored_hashes):
+                    if sha256 is None:
+                        continue
+                    try:
+                        conn.execute('UPDATE files SET sha256 = ? WHERE id = ?', (sha256, row_id))
+                        conn.execute('UPDATE duplicates SET sha256 = ? WHERE original_id = ?', (sha256, row_id))
+                        conn.commit()
+                    except sqlite3.IntegrityError as e:
+                        conn.rollback()
+                        print(f"警告: 无法更新记录 {row_id} 的完整哈希（已存在相同哈希的记录）: {e}")
+            return hashes
+        finally:
+            conn.close()
+
+    def create_indexes():
+        """为重复检查创建索引（files.sha256 为 UNIQUE，已自带索引）"""
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_dup_sha_path ON duplicates (sha256, filepath)')
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"警告: 创建索引失败: {e}")
+        finally:
+            conn.close()
+
     # 主逻辑
     try:
-        # 统计总文件数
-        total_files = count_valid_files(os.path.join(pre_target_dir, target_dir))
+        create_indexes()
+
+        # 一次并发遍历获取所有文件路径并统计总文件数
+        path_all_files = get_all_files_infos(os.path.join(pre_target_dir, target_dir))
+        total_files = len(path_all_files)
         if total_files == 0:
             print("未找到任何文件！")
             return
 
         print(f"找到 {total_files} 个文件。")
 
-        # 获取所有文件路径
-        path_all_files = get_all_files_infos(os.path.join(pre_target_dir, target_dir))
+        if hash_type == 'tiered':
+            # 两级哈希预筛选，只对快速哈希冲突的文件读取全文
+            print("两级哈希预筛选中...")
+            tiered_hashes.update(tiered_prefilter(
+                [os.path.join(pre_target_dir, root, filename) for root, filename, _, _ in path_all_files]
+            ))
+            num_complet = sum(1 for h in tiered_hashes.values() if h is not None and not h.startswith('FAST:'))
+            print(f"快速哈希冲突、需计算完整哈希的文件: {num_complet}")
 
         # 统计结果
         stats = {
@@ -215,20 +290,18 @@ def add_files2database(
             'skip': 0
         }
 
-        # 使用进度条
-        with tqdm(total=total_files, desc="添加文件到数据库", unit="file") as pbar:
+        # 使用进度条（按批次更新，避免每个文件都刷新）
+        with tqdm(total=total_files, desc="添加文件到数据库", unit="file",
+                  mininterval=0.5, miniters=max(100, total_files // 1000)) as pbar:
             if use_multithreading and num_threads != 1:
                 # 多线程处理
                 with ThreadPoolExecutor(max_workers=num_threads) as executor:
                     # 提交所有任务
-                    futures = []
-                    for file_info in path_all_files:
-                        future = executor.submit(process_file, file_info)
-                        future.add_done_callback(lambda x: pbar.update(1))
-                        futures.append(future)
-
-                    # 等待所有任务完成并统计结果
-                    for future in futures:
+                    futures = [executor.submit(process_file, file_info) for file_info in path_all_files]
+
+                    # 在当前线程中按完成顺序统计结果，每 PBAR_BATCH 个文件更新一次进度条
+                    pending = 0
+                    for future in as_completed(futures):
                         try:
                             result = future.result()
                             if result['status'] in stats:
@@ -236,6 +309,11 @@ def add_files2database(
                         except Exception as e:
                             print(f"任务执行出错: {e}")
                             stats['error'] += 1
+                        pending += 1
+                        if pending >= PBAR_BATCH:
+                            pbar.update(pending)
+                            pending = 0
+                    pbar.update(pending)
 
             else:
                 # 单线程处理
@@ -1,14 +1,36 @@
 import hashlib
+import mmap
 import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 
-def hash_file_complet(file_path, algorithm='sha256'):
-    """计算整个文件的哈希值（包含元数据）"""
+# 小于该大小的文件一次性读取，否则使用内存映射
+MMAP_THRESHOLD = 1 << 20
+
+
+def hash_file_complet(file_path, algorithm='sha256', file_size=None):
+    """
+    计算整个文件的哈希值（包含元数据）
+    参数:
+        file_path: 文件路径
+        algorithm: 哈希算法，默认为'sha256'
+        file_size: 文件大小（已知时传入可省去一次stat）
+    返回:
+        文件的完整哈希值
+    """
     hash_func = hashlib.new(algorithm)
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+
     with open(file_path, 'rb') as f:
-        # 分块读取以避免大文件内存问题
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_func.update(chunk)
+        if file_size < MMAP_THRESHOLD:
+            # 小文件一次读取，没有循环开销
+            hash_func.update(f.read())
+        else:
+            # 大文件内存映射，避免分块复制
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hash_func.update(mm)
     return hash_func.hexdigest()
 
 
@@ -56,6 +78,52 @@ def hash_file_fast(file_path, algorithm='sha256', chunk_size=8192):
     return hash_func.hexdigest()
 
 
+def hash_files_tiered(file_paths, algorithm='sha256', num_threads=None, force_complet=None):
+    """
+    两级哈希预筛选：先用 hash_file_fast 对所有文件分组，只对快速哈希冲突（组内>=2个文件）的文件计算完整哈希
+    参数:
+        file_paths: 文件路径列表
+        algorithm: 哈希算法，默认为'sha256'
+        num_threads: 线程数（None=使用默认线程池线程数）
+        force_complet: 可选的判断函数 (文件路径, 快速哈希) -> bool，对每个快速哈希成功的文件调用一次，
+                       返回 True 时即使本批次内快速哈希唯一也计算完整哈希（例如与数据库中已有记录冲突时）
+    返回:
+        dict: {文件路径: 哈希值}，快速哈希唯一的文件以 'FAST:' 为前缀，计算失败的文件值为 None
+    """
+    def safe_hash(func, file_path):
+        try:
+            return func(file_path, algorithm)
+        except Exception as e:
+            print(f"计算哈希值时出错 {file_path}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        # 1. 快速哈希（仅读取大小和头/中/尾各8KB）
+        fast_hashes = list(executor.map(lambda p: safe_hash(hash_file_fast, p), file_paths))
+
+        groups = defaultdict(list)
+        for file_path, fast_hash in zip(file_paths, fast_hashes):
+            groups[fast_hash].append(file_path)
+
+        results = {}
+        to_hash_complet = []
+        for fast_hash, paths in groups.items():
+            if fast_hash is None:
+                results.update((path, None) for path in paths)
+            else:
+                forced = [force_complet(path, fast_hash) for path in paths] if force_complet else []
+                if len(paths) == 1 and not any(forced):
+                    results[paths[0]] = 'FAST:' + fast_hash
+                else:
+                    to_hash_complet.extend(paths)
+
+        # 2. 只对快速哈希冲突的文件计算完整哈希
+        complet_hashes = executor.map(lambda p: safe_hash(hash_file_complet, p), to_hash_complet)
+        results.update(zip(to_hash_complet, complet_hashes))
+
+    return results
+
+
 if __name__ == '__main__':
     # 检查算法是否可用
     print(hashlib.algorithms_available)  # 所有可用算法
@@ -1,4 +1,6 @@
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 
 def get_human_readable_size(size_bytes):
@@ -12,6 +14,19 @@ def get_human_readable_size(size_bytes):
     return f"{size_bytes:.2f} PB"
 
 
+# 定义文件类型映射
+FILE_TYPE_MAPPING = {
+    'video': ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm'],
+    'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma'],
+    'picture': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.svg'],
+    'document': ['.txt', '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+                 '.csv', '.json', '.xml', '.html', '.htm', '.md']
+}
+
+# 后缀 -> 类型 的反向映射（模块加载时构建一次）
+_SUFFIX_TO_CATEGORY = {ext: type_name for type_name, exts in FILE_TYPE_MAPPING.items() for ext in exts}
+
+
 def get_file_suffix_category(filename):
     """
     获取文件后缀和类型
@@ -22,31 +37,12 @@ def get_file_suffix_category(filename):
     返回:
     tuple: (后缀, 类型) 例如: ('.mp4', 'video')
     """
-
-    # 定义文件类型映射
-    file_type_mapping = {
-        'video': ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm'],
-        'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma'],
-        'picture': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.svg'],
-        'document': ['.txt', '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
-                     '.csv', '.json', '.xml', '.html', '.htm', '.md']
-    }
-
     # 获取文件后缀（转换为小写以便比较）
-    if '.' in filename:
-        suffix = '.' + filename.split('.')[-1].lower()
-    else:
-        suffix = ''
+    _, sep, ext = filename.rpartition('.')
+    suffix = '.' + ext.lower() if sep else ''
 
     # 判断文件类型
-    file_type = 'other'
-
-    for type_name, extensions in file_type_mapping.items():
-        if suffix in extensions:
-            file_type = type_name
-            break
-
-    return suffix, file_type
+    return suffix, _SUFFIX_TO_CATEGORY.get(suffix, 'other')
 
 
 def get_disk_usage(target_dir):
@@ -64,6 +60,57 @@ def get_disk_usage(target_dir):
     }
 
 
+def _scan_one_dir(directory):
+    """扫描单个目录，返回 (非隐藏文件名列表, 非隐藏子目录路径列表)"""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # 与 os.walk 一致：不进入指向目录的符号链接
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                else:
+                    files.append(entry.name)
+    except OSError as e:
+        print(f"无法遍历文件夹 {directory}: {e}")
+    return files, subdirs
+
+
+def scan_files_concurrent(directory, max_workers=8):
+    """
+    多线程并发遍历目录树（跳过隐藏文件和隐藏目录），在网络/云盘挂载上可重叠各目录的列举延迟
+
+    参数:
+    directory (str): 要遍历的根目录
+    max_workers (int): 并发扫描的线程数，同时也限制了同时打开的目录数
+
+    返回:
+    list: [(所在目录, 文件名), ...]，按目录和文件名排序，与各线程完成的先后无关，
+          保证每次运行的顺序相同（查重时先入库的文件被记为原文件）
+    """
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_scan_one_dir, directory): directory}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                root = pending.pop(future)
+                files, subdirs = future.result()
+                results.extend((root, file) for file in files)
+                for subdir in subdirs:
+                    pending[executor.submit(_scan_one_dir, subdir)] = subdir
+    results.sort()
+    return results
+
+
 # 测试示例
 if __name__ == "__main__":
     test_files = [
@@ -39,23 +39,22 @@ def sync_directories(img_dir, label_dir, pre_num=32):
     # 2. 获取文件列表并构建映射
     # img_map: 键是文件名截取前pre_num位, 值是完整文件名(含.png)
     img_map = {}
-    for f in os.listdir(img_dir):
-        if f.lower().endswith('.png') and not f.startswith('.'):
-            # 去除后缀
-            name_no_ext = os.path.splitext(f)[0]
-            # 核心修改：只取前pre_num个字符作为对比用的 Key
-            key = name_no_ext[:pre_num]
-            img_map[key] = f
-
-    # label_map: 键是文件名, 值是文件名 (无后缀)
-    label_map = {
-        f: f
-        for f in os.listdir(label_dir)
-        if not f.startswith('.') and '.' not in f
-    }
-
-    img_set = set(img_map.keys())
-    label_set = set(label_map.keys())
+    with os.scandir(img_dir) as entries:
+        for entry in entries:
+            f = entry.name
+            if f.lower().endswith('.png') and not f.startswith('.'):
+                # 去除后缀(.png 固定4个字符)，只取前pre_num个字符作为对比用的 Key
+                img_map[f[:-4][:pre_num]] = f
+
+    # label_set: 无后缀文件名即为 Key，无需额外映射
+    with os.scandir(label_dir) as entries:
+        label_set = {
+            entry.name
+            for entry in entries
+            if not entry.name.startswith('.') and '.' not in entry.name
+        }
+
+    img_set = img_map.keys()
 
     # 3. 计算差异
     # 在图片文件夹里有(截取后)，但标签文件夹里没有
@@ -80,7 +79,7 @@ def sync_directories(img_dir, label_dir, pre_num=32):
     if extra_in_labels:
         print(f"\n[无后缀文件夹] 多余的文件 ({len(extra_in_labels)} 个):")
         for key in extra_in_labels:
-            print(f"  - {label_map[key]}")
+            print(f"  - {key}")
 
     print("-" * 30)
 
@@ -103,7 +102,7 @@ def sync_directories(img_dir, label_dir, pre_num=32):
 
         # 删除多余的无后缀文件
         for key in extra_in_labels:
-            file_path = os.path.join(label_dir, label_map[key])
+            file_path = os.path.join(label_dir, key)
             try:
                 os.remove(file_path)
                 print(f"已删除: {file_path}")
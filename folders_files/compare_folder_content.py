@@ -1,7 +1,19 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from folders_files.utiles import iter_files
+
+
+def _remove_file(path):
+    """删除单个文件，成功返回 None，失败返回异常"""
+    try:
+        os.remove(path)
+        return None
+    except Exception as e:
+        return e
+
 
 def compare_and_clean_directories(source_dir, dest_dir):
     """
@@ -16,29 +28,20 @@ def compare_and_clean_directories(source_dir, dest_dir):
     print("-" * 30)
 
     # --- 1. 获取源目录所有文件名 (递归，集合) ---
-    source_filenames = set()
-    for root, dirs, files in os.walk(source_dir):
-        # 排除隐藏文件夹
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
-        for f in files:
-            # 排除隐藏文件
-            if not f.startswith('.'):
-                source_filenames.add(f)
+    # 排除隐藏文件和隐藏文件夹
+    source_filenames = frozenset(entry.name for entry in iter_files(source_dir))
 
     # --- 2. 获取目标目录所有文件名及路径 (单层，字典映射) ---
     # 格式: {'filename.txt': '/path/to/dest/filename.txt'}
-    dest_files_map = {}
     if os.path.exists(dest_dir):
-        for f in os.listdir(dest_dir):
-            full_path = os.path.join(dest_dir, f)
+        with os.scandir(dest_dir) as entries:
             # 排除隐藏文件和文件夹
-            if not f.startswith('.') and os.path.isfile(full_path):
-                dest_files_map[f] = full_path
+            dest_files_map = {e.name: e.path for e in entries if e.name[0] != '.' and e.is_file()}
     else:
         print(f"错误: 目标目录不存在 {dest_dir}")
         return
 
-    dest_filenames = set(dest_files_map.keys())
+    dest_filenames = frozenset(dest_files_map)
 
     # --- 3. 集合运算 ---
     common_files = source_filenames & dest_filenames
@@ -70,14 +73,15 @@ def compare_and_clean_directories(source_dir, dest_dir):
             elif choice == 'd':
                 confirm = input(f"警告: 确定要永久删除这 {len(extra_in_dest)} 个文件吗? (y/n): ")
                 if confirm.lower() == 'y':
+                    # 线程池并发删除
+                    with ThreadPoolExecutor(max_workers=8) as executor:
+                        errors = list(executor.map(_remove_file, (dest_files_map[name] for name in extra_in_dest)))
                     count = 0
-                    for name in extra_in_dest:
-                        path_to_remove = dest_files_map[name]
-                        try:
-                            os.remove(path_to_remove)
+                    for name, error in zip(extra_in_dest, errors):
+                        if error is None:
                             count += 1
-                        except Exception as e:
-                            print(f"删除失败 {name}: {e}")
+                        else:
+                            print(f"删除失败 {name}: {error}")
                     print(f"已删除 {count} 个文件。")
                 else:
                     print("取消删除。")
@@ -87,18 +91,24 @@ def compare_and_clean_directories(source_dir, dest_dir):
                 extra_dir = os.path.join(dest_dir, "extra")
                 Path(extra_dir).mkdir(parents=True, exist_ok=True)
 
+                # 一次 scandir 获取 extra 文件夹已有文件名，重名检查在内存中完成
+                with os.scandir(extra_dir) as entries:
+                    taken_names = {e.name for e in entries}
+
                 count = 0
                 for name in extra_in_dest:
                     src_path = dest_files_map[name]
-                    target_path = os.path.join(extra_dir, name)
 
                     # 处理重名 (如果extra里已经有了)
-                    if os.path.exists(target_path):
+                    target_name = name
+                    if target_name in taken_names:
                         base, ext = os.path.splitext(name)
                         c = 1
-                        while os.path.exists(os.path.join(extra_dir, f"{base}_{c}{ext}")):
+                        while f"{base}_{c}{ext}" in taken_names:
                             c += 1
-                        target_path = os.path.join(extra_dir, f"{base}_{c}{ext}")
+                        target_name = f"{base}_{c}{ext}"
+                    taken_names.add(target_name)
+                    target_path = os.path.join(extra_dir, target_name)
 
                     try:
                         shutil.move(src_path, target_path)
@@ -1,8 +1,20 @@
 import os
-import shutil
+import sys
 import random
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain, islice
 from pathlib import Path
 
+from folders_files.utiles import iter_files, move_file
+
+# 每个线程任务一次处理的 stat 数量
+STAT_BATCH_SIZE = 256
+# 默认顺序模式下，选中大小达到目标的该比例后停止遍历
+EARLY_STOP_RATIO = 0.99
+# move_files 每累计多少行输出写一次 stdout
+PRINT_BATCH_SIZE = 256
+
 
 def move_files_by_count(source_dir, dest_dir, file_count, file_extensions=None, exclude_hidden=True):
     """
@@ -26,8 +38,8 @@ def move_files_by_count(source_dir, dest_dir, file_count, file_extensions=None,
     if not os.path.exists(source_dir):
         raise ValueError(f"源目录不存在: {source_dir}")
 
-    # 收集所有符合条件的文件
-    all_files = collect_files(source_dir, file_extensions, exclude_hidden)
+    # 收集符合条件的文件，找到 file_count 个后立即停止遍历
+    all_files = [entry.path for entry in islice(iter_files(source_dir, file_extensions, exclude_hidden, files_only=True), file_count)]
 
     print(f"找到 {len(all_files)} 个符合条件的文件")
 
@@ -41,7 +53,7 @@ def move_files_by_count(source_dir, dest_dir, file_count, file_extensions=None,
 
 
 def move_files_by_size(source_dir, dest_dir, target_size_gb, file_extensions=None, exclude_hidden=True,
-                       sort_mode='default', scaling=1000):
+                       sort_mode='default', scaling=1000, stat_threads=32, swap_fill=True):
     """
     移动文件直到达到指定的大小（GB），尽可能接近但不超过该大小。
 
@@ -57,55 +69,62 @@ def move_files_by_size(source_dir, dest_dir, target_size_gb, file_extensions=Non
             - 'random': 随机打乱后选择
             - 'asc': 从小到大优先（能移动更多数量的文件）
             - 'desc': 从大到小优先（优先移动大文件）
+        stat_threads (int): 并发获取文件大小的线程数（HDD/NAS/NFS上 stat 延迟高，并发可显著加速）
+        swap_fill (bool): 贪心选择后，尝试用未选中的较大文件替换已选中的较小文件来填补剩余空间
     """
 
     # 1. 基础单位转换 (1 GB = scaling^3 Bytes)
     target_bytes = target_size_gb * (scaling ** 3)
 
-    # 2. 收集所有符合条件的文件
-    all_files_paths = collect_files(source_dir, file_extensions, exclude_hidden)
-
-    if not all_files_paths:
-        print("未找到符合条件的文件。")
-        return None
-
-    # 3.以此获取文件大小信息，构建 (path, size) 列表
-    files_with_size = []
-    for fp in all_files_paths:
-        try:
-            s = os.path.getsize(fp)
-            if s > 0:  # 排除0字节文件
-                files_with_size.append((fp, s))
-        except OSError:
-            continue
-
-    print(f"找到 {len(files_with_size)} 个有效文件，准备筛选...")
-
-    # 4. 根据策略排序
-    if sort_mode == 'random':
-        random.shuffle(files_with_size)
-    elif sort_mode == 'asc':
-        # 按大小升序（优先塞满小文件，通常能让总大小更接近目标值）
-        files_with_size.sort(key=lambda x: x[1])
-    elif sort_mode == 'desc':
-        # 按大小降序
-        files_with_size.sort(key=lambda x: x[1], reverse=True)
-
-    # 5. 贪心算法选择文件
+    # 2. 流式遍历符合条件的文件，并发获取文件大小，得到 (path, size) 序列（排除0字节和无法访问的文件）
+    paths = (entry.path for entry in iter_files(source_dir, file_extensions, exclude_hidden, files_only=True))
+    files_with_size = _iter_files_with_size(paths, stat_threads)
+
+    # 3. 根据策略排序（只有需要排序/打乱的模式才需要一次性读取全部文件）
+    if sort_mode in ('random', 'asc', 'desc'):
+        files_with_size = list(files_with_size)
+        print(f"找到 {len(files_with_size)} 个有效文件，准备筛选...")
+        if sort_mode == 'random':
+            random.shuffle(files_with_size)
+        elif sort_mode == 'asc':
+            # 按大小升序（优先塞满小文件，通常能让总大小更接近目标值）
+            files_with_size.sort(key=lambda x: x[1])
+        elif sort_mode == 'desc':
+            # 按大小降序
+            files_with_size.sort(key=lambda x: x[1], reverse=True)
+
+    # 4. 贪心算法选择文件（默认模式边遍历边选择，接近目标大小后提前停止遍历）
     selected_files = []
+    unselected_files = []
     current_bytes = 0
+    scanned_count = 0
+    early_stop_bytes = target_bytes * EARLY_STOP_RATIO
 
     for file_path, file_size in files_with_size:
+        scanned_count += 1
         # 如果加上这个文件不超过目标大小，则添加
         if current_bytes + file_size <= target_bytes:
-            selected_files.append(file_path)
+            # 连同已知大小一起传给 move_files，避免重复 stat
+            selected_files.append((file_path, file_size))
             current_bytes += file_size
+            if sort_mode == 'default' and current_bytes >= early_stop_bytes:
+                break
         else:
             # 如果是随机或默认模式，可以继续尝试找更小的文件来填缝
             # 如果不想为了填缝遍历所有文件，可以在这里 break
-            continue
+            unselected_files.append((file_path, file_size))
 
-    # 6. 打印统计信息
+    if scanned_count == 0:
+        print("未找到符合条件的文件。")
+        return None
+    if sort_mode == 'default':
+        print(f"扫描了 {scanned_count} 个有效文件")
+
+    # 贪心扫描已把能放下的文件都放进去了，剩余空间只能通过交换来填补
+    if swap_fill and selected_files and unselected_files:
+        current_bytes = target_bytes - _improve_by_swaps(selected_files, unselected_files, target_bytes - current_bytes)
+
+    # 5. 打印统计信息
     current_gb = current_bytes / (scaling ** 3)
     print(f"-" * 30)
     print(f"筛选结果:")
@@ -119,7 +138,7 @@ def move_files_by_size(source_dir, dest_dir, target_size_gb, file_extensions=Non
         print("警告: 没有选中任何文件（可能是因为单个文件大小超过了目标限制）。")
         return None
 
-    # 7. 调用原有的 move_files 函数执行移动
+    # 6. 调用原有的 move_files 函数执行移动
     return move_files(selected_files, dest_dir, len(selected_files))
 
 
@@ -147,36 +166,113 @@ def collect_files(source_dir, file_extensions=None, exclude_hidden=True):
     """
     收集目录中所有符合条件的文件
     """
-    all_files = []
+    return [entry.path for entry in iter_files(source_dir, file_extensions, exclude_hidden, files_only=True)]
 
-    for root, dirs, files in os.walk(source_dir):
-        # 过滤隐藏文件和目录
-        if exclude_hidden:
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            files = [f for f in files if not f.startswith('.')]
 
-        for file in files:
-            file_path = os.path.join(root, file)
+def _improve_by_swaps(selected, unselected, capacity_left, max_rounds=100):
+    """
+    交换改进：每轮找出增益最大的一对 (已选中文件 f_out, 未选中文件 f_in)，
+    满足 0 < size(f_in) - size(f_out) <= 剩余空间，交换后总大小更接近目标且不超过目标
 
-            if exclude_hidden and os.path.basename(file_path).startswith('.'):
-                continue
+    参数:
+        selected (list): 已选中的 (path, size) 列表，原地修改
+        unselected (list): 未选中的 (path, size) 列表
+        capacity_left: 当前剩余空间（字节）
+        max_rounds (int): 最多交换次数
+    返回:
+        交换后的剩余空间（字节）
+    """
+    unselected = sorted(unselected, key=lambda x: x[1])
+    unselected_sizes = [size for _, size in unselected]
+
+    for _ in range(max_rounds):
+        if capacity_left <= 0 or not unselected:
+            break
+
+        best = None  # (增益, selected下标, unselected下标)
+        for i, (_, out_size) in enumerate(selected):
+            # 二分查找能换入的最大文件
+            j = bisect_right(unselected_sizes, out_size + capacity_left) - 1
+            if j >= 0:
+                gain = unselected_sizes[j] - out_size
+                if gain > 0 and (best is None or gain > best[0]):
+                    best = (gain, i, j)
+
+        if best is None:
+            break
+
+        gain, i, j = best
+        out_item = selected[i]
+        selected[i] = unselected.pop(j)
+        unselected_sizes.pop(j)
+        # 换出的文件放回未选中列表，保持有序
+        k = bisect_left(unselected_sizes, out_item[1])
+        unselected.insert(k, out_item)
+        unselected_sizes.insert(k, out_item[1])
+        capacity_left -= gain
+
+    return capacity_left
+
+
+def _iter_files_with_size(paths, stat_threads):
+    """
+    按窗口从 paths 中取出文件，用线程池并发获取大小，逐个产出 (path, size)
+    只在需要时继续遍历目录，不必先把整棵目录树读入内存
+    """
+    window = stat_threads * STAT_BATCH_SIZE
+    with ThreadPoolExecutor(max_workers=stat_threads) as executor:
+        while True:
+            chunk = list(islice(paths, window))
+            if not chunk:
+                return
+            # 按批次提交，每个任务连续完成 STAT_BATCH_SIZE 个 stat，减少逐个提交任务的开销
+            batches = [chunk[i:i + STAT_BATCH_SIZE] for i in range(0, len(chunk), STAT_BATCH_SIZE)]
+            sizes = chain.from_iterable(executor.map(_get_sizes_batch, batches))
+            # 排除0字节文件和无法访问的文件
+            yield from ((fp, size) for fp, size in zip(chunk, sizes) if size > 0)
 
-            # 检查文件扩展名
-            if file_extensions:
-                file_ext = os.path.splitext(file)[1].lower()
-                if file_ext not in [ext.lower() for ext in file_extensions]:
-                    continue
 
-            # 确保是文件而不是目录
-            if os.path.isfile(file_path):
-                all_files.append(file_path)
+def _get_size_or_zero(file_path):
+    """获取文件大小，无法访问时返回0"""
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
 
-    return all_files
 
+def _get_sizes_batch(file_paths):
+    """批量获取一组文件的大小"""
+    return [_get_size_or_zero(fp) for fp in file_paths]
 
-def move_files(files_to_move, dest_dir, total_count):
+
+class _BatchedPrinter:
+    """缓存输出行，每 PRINT_BATCH_SIZE 行一次性写入 stdout"""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or PRINT_BATCH_SIZE
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            sys.stdout.write('\n'.join(self.lines) + '\n')
+            sys.stdout.flush()
+            self.lines.clear()
+
+
+def move_files(files_to_move, dest_dir, total_count, max_workers=4):
     """
     移动文件列表到目标目录
+
+    目标文件名在当前线程中依次确定（避免并发时重名），实际移动交给线程池并发执行
+
+    参数:
+        files_to_move (list): 文件路径列表，或 (文件路径, 文件大小) 列表（已知大小时免去再次 stat）
+        max_workers (int): 并发移动的线程数（机械硬盘建议4-8，NVMe可设为16-32，1为串行）
     """
 
     # 确保目标目录存在
@@ -184,54 +280,73 @@ def move_files(files_to_move, dest_dir, total_count):
 
     moved_files = []
     skipped_files = []
+    # 逐文件的输出先缓存，攒够一批再一次性写出，避免每个文件都刷新 stdout
+    log = _BatchedPrinter()
+    # 一次 scandir 获取目标目录已有文件名，之后的重名检查都在内存中完成（包括本批次已分配的文件名）
+    with os.scandir(dest_dir) as entries:
+        taken_names = {entry.name for entry in entries}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for i, item in enumerate(files_to_move):
+            file_path, file_size = item if isinstance(item, tuple) else (item, None)
+            try:
+                # 获取文件名
+                filename = os.path.basename(file_path)
+
+                if file_size is None:
+                    # 一次 stat 同时检查源文件是否存在并获取大小
+                    try:
+                        file_size = os.stat(file_path).st_size
+                    except FileNotFoundError:
+                        log.write(f"文件不存在: {file_path}")
+                        skipped_files.append(file_path)
+                        continue
+
+                # 检查文件大小，避免移动空文件或系统文件
+                if file_size == 0:
+                    log.write(f"跳过空文件: {file_path}")
+                    skipped_files.append(file_path)
+                    continue
 
-    for i, file_path in enumerate(files_to_move):
-        try:
-            # 获取文件名
-            filename = os.path.basename(file_path)
-
-            # 检查源文件是否存在
-            if not os.path.exists(file_path):
-                print(f"文件不存在: {file_path}")
-                skipped_files.append(file_path)
-                continue
-
-            # 检查文件大小，避免移动空文件或系统文件
-            file_size = os.path.getsize(file_path)
-            if file_size == 0:
-                print(f"跳过空文件: {file_path}")
-                skipped_files.append(file_path)
-                continue
-
-            dest_path = os.path.join(dest_dir, filename)
-
-            # 处理文件名冲突
-            counter = 1
-            base_name, ext = os.path.splitext(filename)
-            while os.path.exists(dest_path):
-                dest_path = os.path.join(dest_dir, f"{base_name}_{counter}{ext}")
-                counter += 1
-
-            # 移动文件
-            print(f"正在移动 ({i + 1}/{total_count}): {filename}", end='\t')
-            shutil.move(file_path, dest_path)
-
-            # 验证移动是否成功
-            if os.path.exists(dest_path) and not os.path.exists(file_path):
-                moved_files.append({
+                # 处理文件名冲突
+                dest_name = filename
+                if dest_name in taken_names:
+                    # 只有真正冲突时才拆分文件名
+                    base_name, ext = os.path.splitext(filename)
+                    counter = 1
+                    while dest_name in taken_names:
+                        dest_name = f"{base_name}_{counter}{ext}"
+                        counter += 1
+                taken_names.add(dest_name)
+                dest_path = os.path.join(dest_dir, dest_name)
+
+                # 提交移动任务
+                log.write(f"正在移动 ({i + 1}/{total_count}): {filename}")
+                future = executor.submit(move_file, file_path, dest_path)
+                futures[future] = {
                     'original_path': file_path,
                     'new_path': dest_path,
                     'filename': filename,
                     'size': file_size
-                })
-                print(f"✓ 成功移动: {filename}")
-            else:
-                print(f"✗ 移动验证失败: {filename}")
+                }
+
+            except Exception as e:
+                log.write(f"✗ 移动文件失败 {os.path.basename(file_path)}: {e}")
                 skipped_files.append(file_path)
 
-        except Exception as e:
-            print(f"✗ 移动文件失败 {os.path.basename(file_path)}: {e}")
-            skipped_files.append(file_path)
+        # 按完成顺序收集结果（失败时抛出异常，无需再验证）
+        for future in as_completed(futures):
+            info = futures[future]
+            try:
+                future.result()
+                moved_files.append(info)
+                log.write(f"✓ 成功移动: {info['filename']}")
+            except Exception as e:
+                log.write(f"✗ 移动文件失败 {info['filename']}: {e}")
+                skipped_files.append(info['original_path'])
+
+    log.flush()
 
     # 返回结果信息
     result = {
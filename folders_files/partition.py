@@ -1,9 +1,9 @@
 import shutil
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Tuple, Dict, Optional
 import time
 
-from folders_files.utiles import remove_empty_folders, get_dir_size
+from folders_files.utiles import remove_empty_folders, get_dir_size, get_dir_sizes
 
 
 def split_folder_by_size(folderpath: str, threshsize: float=20, use_decimal=True) -> List[Path]:
@@ -34,11 +34,14 @@ def split_folder_by_size(folderpath: str, threshsize: float=20, use_decimal=True
     print(f"开始处理文件夹: {folderpath}")
     print(f"阈值: {threshsize}GB ({threshold / 1024 / 1024 / 1024:.2f}GB)")
 
+    # 一次遍历计算所有文件夹的大小，递归处理各层时共用，新建的分割文件夹再补充进去
+    dir_sizes = get_dir_sizes(folderpath)
+
     # 只处理目标文件夹的直接子文件夹，不处理目标文件夹本身
     created_folders = []
     for item in folderpath.iterdir():
         if item.is_dir() and not item.name.startswith('.') and not _is_temp_folder(item):
-            created_folders.extend(_process_folder_recursive(item, int(threshold), is_root=True))
+            created_folders.extend(_process_folder_recursive(item, int(threshold), dir_sizes, is_root=True))
     print(f"\n处理完成！共创建了 {len(created_folders)} 个分割文件夹")
 
     remove_empty_folders(folderpath)
@@ -46,9 +49,11 @@ def split_folder_by_size(folderpath: str, threshsize: float=20, use_decimal=True
     return created_folders
 
 
-def _process_folder_recursive(folder: Path, threshold: int, is_root: bool = False) -> List[Path]:
+def _process_folder_recursive(folder: Path, threshold: int, dir_sizes: Dict[Path, int],
+                              is_root: bool = False) -> List[Path]:
     """
     递归处理文件夹，自底向上确保所有文件夹都不超过阈值
+    dir_sizes 为 get_dir_sizes 得到的 {文件夹Path: 大小}，各层共用
     """
     created_folders = []
 
@@ -57,21 +62,23 @@ def _process_folder_recursive(folder: Path, threshold: int, is_root: bool = Fals
         if item.is_dir() and not item.name.endswith('.rtfd'):
             # 跳过已创建的分割文件夹和临时文件夹
             if not (_is_split_folder(item) or _is_temp_folder(item)):
-                created_folders.extend(_process_folder_recursive(item, threshold))
+                created_folders.extend(_process_folder_recursive(item, threshold, dir_sizes))
 
     # 处理完所有子文件夹后，处理当前文件夹
     # 对于根级子文件夹，我们进行处理；对于其他情况，按原逻辑处理
     if not is_root or (is_root and folder.parent.name != folder.name):
-        current_created = _process_current_folder(folder, threshold, is_root)
+        current_created = _process_current_folder(folder, threshold, dir_sizes, is_root)
 
         created_folders.extend(current_created)
 
     return created_folders
 
 
-def _process_current_folder(folder: Path, threshold: int, is_root: bool = False) -> List[Path]:
+def _process_current_folder(folder: Path, threshold: int, dir_sizes: Dict[Path, int],
+                            is_root: bool = False) -> List[Path]:
     """
     处理当前文件夹，确保其内容不超过阈值
+    新建的分割文件夹的大小会写入 dir_sizes，供上层文件夹直接使用
     """
     created_folders = []
 
@@ -85,8 +92,8 @@ def _process_current_folder(folder: Path, threshold: int, is_root: bool = False)
     if not items:
         return created_folders
 
-    # 计算当前文件夹总大小
-    folder_size = get_dir_size(folder)
+    # 计算当前文件夹总大小（子文件夹分割只是在本文件夹内移动，总大小不变）
+    folder_size = dir_sizes.get(folder, 0)
 
     if folder_size <= threshold:
         # 当前文件夹不需要分割
@@ -97,7 +104,7 @@ def _process_current_folder(folder: Path, threshold: int, is_root: bool = False)
     # 计算每个项目的大小并排序（从大到小）
     item_sizes = []
     for item in items:
-        size = _get_item_size(item)
+        size = _get_item_size(item, dir_sizes)
         item_sizes.append((item, size, item.name))
 
     # 按大小降序排序
@@ -130,6 +137,7 @@ def _process_current_folder(folder: Path, threshold: int, is_root: bool = False)
         print(f"  创建分割文件夹: {part_name}")
 
         # 移动项目到分割文件夹
+        part_size = 0
         for item, size, name in part_items:
             destination = part_folder / item.name
             if item.exists():
@@ -138,12 +146,14 @@ def _process_current_folder(folder: Path, threshold: int, is_root: bool = False)
                         shutil.move(str(item), str(destination))
                     elif item.is_dir():
                         shutil.move(str(item), str(destination))
+                    part_size += size
                     print(f"    移动: {item.name} -> {part_name}/")
                 except Exception as e:
                     print(f"    移动失败 {item.name}: {e}")
 
         # 检查是否只有一个子文件夹，如果是则提前内容
         part_folder = _flatten_single_subfolder(part_folder)
+        dir_sizes[part_folder] = part_size
     try:
         ds_store = folder / ".DS_Store"
         ds_store.unlink(missing_ok=True)
@@ -165,29 +175,32 @@ def _optimized_bin_packing(item_sizes: List[Tuple[Path, int, str]], threshold: i
     oversized_items = [(item, size, name) for item, size, name in item_sizes if size > threshold]
 
     parts = []
+    # 与 parts 平行的各部分已用大小，增量维护，避免每次重新求和
+    part_sizes = []
 
     # 首先处理超大项目，每个单独一个部分
     for item_info in oversized_items:
         parts.append([item_info])
+        part_sizes.append(item_info[1])
 
     # 对有效项目使用最佳适应递减算法
     valid_items.sort(key=lambda x: x[1], reverse=True)  # 从大到小排序
 
     for item_info in valid_items:
-        item, size, name = item_info
-        placed = False
+        size = item_info[1]
+        # 可容纳当前项目的部分，其已用大小不能超过 limit
+        limit = threshold - size
 
         # 尝试放入现有的部分
-        for part in parts:
-            part_size = sum(size for _, size, _ in part)
-            if part_size + size <= threshold:
-                part.append(item_info)
-                placed = True
+        for i, part_size in enumerate(part_sizes):
+            if part_size <= limit:
+                parts[i].append(item_info)
+                part_sizes[i] = part_size + size
                 break
-
-        # 如果不能放入现有部分，创建新部分
-        if not placed:
+        else:
+            # 如果不能放入现有部分，创建新部分
             parts.append([item_info])
+            part_sizes.append(size)
 
     return parts
 
@@ -237,14 +250,16 @@ def _flatten_single_subfolder(folder: Path) -> Path:
     return folder
 
 
-def _get_item_size(item: Path) -> int:
+def _get_item_size(item: Path, dir_sizes: Optional[Dict[Path, int]] = None) -> int:
     """
-    获取文件或文件夹的大小
+    获取文件或文件夹的大小，文件夹优先从 dir_sizes 缓存中读取
     """
     try:
         if item.is_file():
             return item.stat().st_size
         elif item.is_dir():
+            if dir_sizes is not None and item in dir_sizes:
+                return dir_sizes[item]
             return get_dir_size(item)
     except Exception as e:
         print(f"无法获取大小 {item}: {e}")
@@ -280,9 +295,9 @@ def verify_folder_sizes(folderpath, threshsize: float = 20, scale: int = 1000) -
     folderpath = Path(folderpath)
 
     all_valid = True
-    for item in folderpath.rglob('*'):
-        if item.is_dir() and not _is_temp_folder(item):
-            size = get_dir_size(item)
+    # 一次遍历得到所有子文件夹的大小
+    for item, size in get_dir_sizes(folderpath).items():
+        if item != folderpath and not _is_temp_folder(item):
             if size > threshold:
                 print(f"错误: {item} 大小 {_display_size(size)} 超过阈值")
                 all_valid = False
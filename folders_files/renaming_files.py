@@ -15,20 +15,20 @@ def batch_rename_sequential(source_dir, new_prefix, start_index=0, dry_run=True)
         print(f"目录不存在: {source_dir}")
         return
 
-    # 1. 获取并排序所有文件
+    # 1. 获取并排序所有文件（scandir 的目录项自带类型信息，无需再逐个 stat）
     files = []
-    for f in os.listdir(source_dir):
-        # 排除隐藏文件
-        if f.startswith('.'):
-            continue
-
-        full_path = os.path.join(source_dir, f)
-        # 排除文件夹
-        if os.path.isfile(full_path):
-            files.append(f)
+    with os.scandir(source_dir) as it:
+        for entry in it:
+            # 排除隐藏文件
+            if entry.name.startswith('.'):
+                continue
+            # 排除文件夹
+            if entry.is_file():
+                files.append(entry.name)
 
     # 按原始文件名排序，保证重命名顺序的一致性
     files.sort()
+    files_set = set(files)
 
     total_files = len(files)
     print(f"找到 {total_files} 个文件，准备重命名...")
@@ -36,15 +36,18 @@ def batch_rename_sequential(source_dir, new_prefix, start_index=0, dry_run=True)
     # 计算序号的填充长度 (例如 100 个文件，就需要 3 位数: 001, 002...)
     # 至少保留 3 位 (001)，如果文件更多则自动增加
     padding = max(3, len(str(total_files + start_index)))
+    # 新文件名模板只构建一次（前缀中的花括号需转义）
+    prefix = new_prefix.replace('{', '{{').replace('}', '}}')
+    fmt = f"{prefix}_{{:0{padding}d}}{{}}"
 
     count = 0
     for i, filename in enumerate(files):
-        # 获取原文件后缀 (包含点，例如 .jpg)
-        _, ext = os.path.splitext(filename)
+        # 获取原文件后缀 (包含点，例如 .jpg)，没有点时后缀为空
+        _, dot, ext = filename.rpartition('.')
+        ext = dot + ext if dot else ''
 
         # 构建新文件名
-        current_idx = start_index + i
-        new_filename = f"{new_prefix}_{str(current_idx).zfill(padding)}{ext}"
+        new_filename = fmt.format(start_index + i, ext)
 
         old_path = os.path.join(source_dir, filename)
         new_path = os.path.join(source_dir, new_filename)
@@ -54,7 +57,7 @@ def batch_rename_sequential(source_dir, new_prefix, start_index=0, dry_run=True)
             continue
 
         # 防止覆盖已存在的同名文件
-        if os.path.exists(new_path) and new_filename not in files:
+        if os.path.exists(new_path) and new_filename not in files_set:
             print(f"[跳过] 目标文件名已存在: {new_filename}")
             continue
 
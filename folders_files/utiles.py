@@ -1,5 +1,24 @@
+import errno
 import os
+import sys
+import shutil
 from pathlib import Path
+from typing import Dict, Iterator
+
+# macOS 的 clonefile：同一 APFS 卷内写时复制克隆文件，不复制数据
+_clonefile = None
+if sys.platform == 'darwin':
+    try:
+        import ctypes
+        _clonefile = ctypes.CDLL(None, use_errno=True).clonefile
+        _clonefile.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32)
+        _clonefile.restype = ctypes.c_int
+    except (OSError, AttributeError):  # 系统版本过旧
+        _clonefile = None
+
+# 单次 copy_file_range 最多复制的字节数，以及回退到普通复制时的缓冲区大小
+COPY_RANGE_MAX_COUNT = 1 << 30
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
 
 def remove_empty_folders(target_dir):
     """
@@ -39,6 +58,126 @@ def remove_empty_folders(target_dir):
     print(f"清理完成，共删除了 {deleted_count} 个空文件夹")
 
 
+def _file_ext(filename) -> str:
+    """与 os.path.splitext(filename)[1].lower() 结果相同，单次从右向左扫描"""
+    stem, dot, ext = filename.rpartition('.')
+    return '.' + ext.lower() if dot and stem.lstrip('.') else ''
+
+
+def iter_files(root, file_extensions=None, exclude_hidden=True, files_only=False) -> Iterator[os.DirEntry]:
+    """
+    使用显式栈 + os.scandir 逐个产出目录树中的非目录条目（顺序与 os.walk 相同）
+    生成器可随时停止，调用方只需要前K个文件时不必遍历整棵目录树
+    Args:
+        root: 根目录，可以是字符串路径或Path对象
+        file_extensions: 指定文件扩展名列表（不区分大小写），None 表示不过滤
+        exclude_hidden: 是否排除隐藏文件和隐藏目录（以.开头）
+        files_only: 是否只产出普通文件（含指向文件的符号链接），排除 socket/FIFO/失效链接等
+    Yields:
+        os.DirEntry: 符合条件的条目，类型信息已缓存，可直接调用 is_file()/stat()
+    """
+    ext_set = frozenset(ext.lower() for ext in file_extensions) if file_extensions else None
+
+    stack = [os.fspath(root)]
+    while stack:
+        subdirs = []
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if exclude_hidden and name.startswith('.'):
+                        continue
+
+                    # 类型判断均来自 DirEntry 缓存的 d_type，普通文件/目录无需 stat
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        # 与 os.walk 一致：指向目录的符号链接不作为文件产出，也不进入
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    elif ext_set is None or _file_ext(name) in ext_set:
+                        if not files_only or entry.is_file():
+                            yield entry
+        except OSError:
+            continue
+
+        # 逆序入栈，保证按目录列举顺序深度优先遍历
+        stack.extend(reversed(subdirs))
+
+
+def iter_tree(root) -> Iterator[tuple]:
+    """
+    os.walk 的 os.scandir 版本：自顶向下产出 (目录路径, 子目录条目列表, 文件条目列表)，顺序与 os.walk 相同
+    条目都是 os.DirEntry，类型信息已缓存，entry.path 即完整路径，无需再 os.path.join
+    与 os.walk 一样，调用方原地修改子目录条目列表（如 dirs[:] = [...]）即可阻止进入被移除的目录
+    指向目录的符号链接列在子目录中但不进入，无法列举的目录直接跳过
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        top = stack.pop()
+        dirs, files = [], []
+        try:
+            with os.scandir(top) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    (dirs if is_dir else files).append(entry)
+        except OSError:
+            continue
+
+        yield top, dirs, files
+
+        # 逆序入栈，保证按目录列举顺序深度优先遍历
+        stack.extend(entry.path for entry in reversed(dirs) if not entry.is_symlink())
+
+
+def fast_copy(src_file, dst_file, copy_metadata=False):
+    """
+    复制文件内容，优先使用内核的零拷贝/写时复制：
+    macOS 用 clonefile，Linux 用 copy_file_range（XFS/Btrfs 等同一文件系统内可直接 reflink），
+    都不可用时回退到 4MB 缓冲区的普通复制
+    Args:
+        src_file: 源文件路径
+        dst_file: 目标文件路径
+        copy_metadata: 是否同时复制修改时间、权限等元数据（与 shutil.copy2 相同）
+    """
+    if _clonefile is not None and _clonefile(os.fsencode(src_file), os.fsencode(dst_file), 0) == 0:
+        if copy_metadata:
+            shutil.copystat(src_file, dst_file)
+        return
+    # clonefile 失败（跨卷、目标已存在等）时按普通方式复制
+
+    with open(src_file, 'rb', buffering=0) as fsrc, open(dst_file, 'wb', buffering=0) as fdst:
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_RANGE_MAX_COUNT):
+                    pass
+            except OSError:
+                # 文件系统或内核不支持时，从两个文件的当前位置继续普通复制
+                pass
+        shutil.copyfileobj(fsrc, fdst, COPY_BUFFER_SIZE)
+    if copy_metadata:
+        shutil.copystat(src_file, dst_file)
+
+
+def move_file(src, dst):
+    """
+    移动单个文件：同一文件系统直接 os.rename（一次系统调用），
+    跨文件系统时交给 shutil.move（内核态 sendfile 复制后删除源文件）；
+    其他错误（源文件不存在、无权限等）直接抛出，不再重试
+    """
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
 def get_dir_size(folder) -> int:
     """
     获取文件夹的总大小
@@ -58,20 +197,54 @@ def get_dir_size(folder) -> int:
         print(f"路径不是文件夹: {folder}")
         return 0
 
-    try:
-        for item in folder.rglob('*'):
-            if item.is_file() and not item.name.startswith('.'):
-                try:
-                    total_size += item.stat().st_size
-                except (OSError, PermissionError) as e:
-                    print(f"无法访问文件 {item}: {e}")
-                    continue
-    except (OSError, PermissionError) as e:
-        print(f"无法遍历文件夹 {folder}: {e}")
+    # 显式栈 + os.scandir 遍历，文件类型来自 DirEntry 缓存，无需额外 stat
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and not entry.name.startswith('.'):
+                        try:
+                            total_size += entry.stat().st_size
+                        except (OSError, PermissionError) as e:
+                            print(f"无法访问文件 {entry.path}: {e}")
+                            continue
+        except (OSError, PermissionError) as e:
+            print(f"无法遍历文件夹 {current}: {e}")
 
     return total_size
 
 
+def get_dir_sizes(folder) -> Dict[Path, int]:
+    """
+    自底向上一次遍历，计算文件夹及其所有子文件夹的大小
+    Args:
+        folder: 可以是字符串路径或Path对象
+    Returns:
+        dict: {文件夹Path: 总大小（字节）}，与 get_dir_size 一样不统计隐藏文件
+    """
+    sizes = {}
+    for root, dirs, files in os.walk(folder, topdown=False):
+        total_size = 0
+        for file in files:
+            if file.startswith('.'):
+                continue
+            try:
+                total_size += os.path.getsize(os.path.join(root, file))
+            except (OSError, PermissionError) as e:
+                print(f"无法访问文件 {os.path.join(root, file)}: {e}")
+        root = Path(root)
+        # 子文件夹已先于父文件夹遍历完成
+        for d in dirs:
+            total_size += sizes.get(root / d, 0)
+        sizes[root] = total_size
+
+    return sizes
+
+
 # 使用示例
 if __name__ == "__main__":
     target_directory = "apartition"  # 替换为你的目标目录
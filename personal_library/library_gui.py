@@ -2,10 +2,14 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 import os
 from PIL import Image, ImageTk
-import threading
 import cv2
 import time
 
+# 支持的图片和视频格式
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'})
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.mov', '.avi', '.mkv', '.flv', '.wmv'})
+MEDIA_EXTENSIONS = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS
+
 
 class MediaPreviewApp:
     def __init__(self, root):
@@ -44,6 +48,9 @@ class MediaPreviewApp:
 
         self.preview_frame = ttk.Frame(self.main_frame)
         self.preview_frame.grid(row=1, column=1, sticky=(tk.W, tk.E, tk.N, tk.S))
+        # 预览区域尺寸缓存，窗口变化时更新，播放线程读取缓存而不是每帧调用 winfo_*
+        self._preview_size = (0, 0)
+        self.preview_frame.bind('<Configure>', self._on_preview_resize)
 
         # 配置网格权重
         self.main_frame.columnconfigure(1, weight=1)
@@ -78,6 +85,15 @@ class MediaPreviewApp:
         self.current_media_index = -1
         self.is_playing_video = False
         self.video_capture = None
+        # 视频预览复用的 Tk 图像，尺寸不变时每帧只 paste 像素，不再新建 Tcl 图像
+        self._tk_img = None
+        # 视频播放的帧缓冲区、帧间隔（毫秒）和已安排的下一帧任务
+        self._frame_rgb = None
+        self._frame_interval_ms = 33
+        self._play_job = None
+
+    def _on_preview_resize(self, event):
+        self._preview_size = (event.width, event.height)
 
     def select_folder(self):
         folder_path = filedialog.askdirectory(title="选择包含媒体文件的文件夹")
@@ -89,18 +105,13 @@ class MediaPreviewApp:
         self.media_files = []
         self.file_listbox.delete(0, tk.END)
 
-        # 支持的图片和视频格式
-        image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'}
-        video_extensions = {'.mp4', '.mov', '.avi', '.mkv', '.flv', '.wmv'}
-
         try:
-            for filename in os.listdir(folder_path):
-                filepath = os.path.join(folder_path, filename)
-                if os.path.isfile(filepath):
-                    ext = os.path.splitext(filename)[1].lower()
-                    if ext in image_extensions or ext in video_extensions:
-                        self.media_files.append(filepath)
-                        self.file_listbox.insert(tk.END, filename)
+            # scandir 的目录项自带类型信息，无需逐个 isfile
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    if os.path.splitext(entry.name)[1].lower() in MEDIA_EXTENSIONS and entry.is_file():
+                        self.media_files.append(entry.path)
+                        self.file_listbox.insert(tk.END, entry.name)
 
             self.status_var.set(f"找到 {len(self.media_files)} 个媒体文件")
 
@@ -131,7 +142,7 @@ class MediaPreviewApp:
         ext = os.path.splitext(filepath)[1].lower()
 
         # 根据文件类型处理预览
-        if ext in {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'}:
+        if ext in IMAGE_EXTENSIONS:
             self.preview_image(filepath)
         else:
             self.preview_video(filepath)
@@ -167,47 +178,61 @@ class MediaPreviewApp:
             return
 
         self.is_playing_video = True
+        self._tk_img = None
+        self._frame_rgb = None
         self.status_var.set(f"预览视频: {os.path.basename(video_path)}")
 
-        # 在新线程中播放视频
-        thread = threading.Thread(target=self._play_video)
-        thread.daemon = True
-        thread.start()
-
-    def _play_video(self):
-        while self.is_playing_video and self.video_capture.isOpened():
-            ret, frame = self.video_capture.read()
-            if not ret:
-                break
-
-            # 将OpenCV BGR格式转换为RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(frame_rgb)
-
-            # 调整大小以适应预览区域
-            width = self.preview_frame.winfo_width()
-            height = self.preview_frame.winfo_height()
-
-            if width > 1 and height > 1:
-                image.thumbnail((width, height), Image.Resampling.LANCZOS)
+        # 按视频实际帧率播放，帧率未知时按约30fps
+        fps = self.video_capture.get(cv2.CAP_PROP_FPS)
+        self._frame_interval_ms = max(1, int(1000 / fps)) if fps > 0 else 33
 
-            photo = ImageTk.PhotoImage(image)
+        # 在主线程中通过 after 逐帧调度播放
+        self._play_job = self.root.after(0, self._play_video)
 
-            # 在主线程中更新GUI
-            self.root.after(0, self._update_video_frame, photo)
+    def _play_video(self):
+        """读取并显示一帧，然后按帧间隔安排下一帧（全部在 Tk 主线程中执行）"""
+        self._play_job = None
+        if not self.is_playing_video or self.video_capture is None:
+            return
 
-            # 控制帧率
-            time.sleep(1 / 30)  # 约30fps
+        start = time.perf_counter()
+        ret, frame = self.video_capture.read()
+        if not ret:
+            self.video_capture.release()
+            self.video_capture = None
+            return
 
-        self.video_capture.release()
+        # 调整大小以适应预览区域（只缩小不放大），先缩小再转换颜色，减少转换的像素量
+        width, height = self._preview_size
+
+        if width > 1 and height > 1:
+            frame_height, frame_width = frame.shape[:2]
+            scale = min(width / frame_width, height / frame_height)
+            if scale < 1:
+                # INTER_AREA 适合缩小
+                size = (max(1, int(frame_width * scale)), max(1, int(frame_height * scale)))
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+        # 将OpenCV BGR格式转换为RGB，各帧复用同一个缓冲区
+        self._frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._frame_rgb)
+        image = Image.fromarray(self._frame_rgb)
+
+        if self._tk_img is None or (self._tk_img.width(), self._tk_img.height()) != image.size:
+            # 首帧或预览尺寸变化时才新建 Tk 图像
+            self._tk_img = ImageTk.PhotoImage(image)
+            self.preview_label.configure(image=self._tk_img, text="")
+        else:
+            self._tk_img.paste(image)
 
-    def _update_video_frame(self, photo):
-        if self.is_playing_video:
-            self.preview_label.configure(image=photo, text="")
-            self.preview_label.image = photo  # 保持引用
+        # 控制帧率：扣除本帧处理耗时后安排下一帧
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+        self._play_job = self.root.after(max(1, self._frame_interval_ms - elapsed_ms), self._play_video)
 
     def stop_video_playback(self):
         self.is_playing_video = False
+        if self._play_job is not None:
+            self.root.after_cancel(self._play_job)
+            self._play_job = None
         if self.video_capture:
             self.video_capture.release()
             self.video_capture = None
@@ -2,11 +2,24 @@ import os
 import subprocess
 
 
-def extract_audio(in_video_path, audio_save2_path='audios'):
+def _audio_output_path(in_video_path, audio_save2_path):
     current_dir = os.path.dirname(os.path.realpath(__file__))
     video_name = os.path.split(in_video_path)[-1]
     os.makedirs(os.path.join(current_dir, audio_save2_path), exist_ok=True)
-    output_audio_path = os.path.join(current_dir, audio_save2_path, video_name.split('.')[0] + '.aac')
+    return os.path.join(current_dir, audio_save2_path, video_name.split('.')[0] + '.aac')
+
+
+def extract_audio(in_video_path, audio_save2_path='audios'):
+    """
+    提取视频中的音频流（直接复制，无转码）
+    :param in_video_path: 视频路径；传入路径列表时只启动一个 FFmpeg 进程批量提取
+    :param audio_save2_path: 音频保存目录（相对本文件所在目录）
+    :return: 音频路径；传入列表时返回对应的音频路径列表
+    """
+    if isinstance(in_video_path, (list, tuple)):
+        return _extract_audios(in_video_path, audio_save2_path)
+
+    output_audio_path = _audio_output_path(in_video_path, audio_save2_path)
     if os.path.exists(output_audio_path):
         print(output_audio_path, ' already exists !')
         return output_audio_path
@@ -19,7 +32,30 @@ def extract_audio(in_video_path, audio_save2_path='audios'):
         '-hide_banner',  # 隐藏FFmpeg欢迎信息
         '-loglevel', 'error'  # 只显示错误日志
     ]
-    subprocess.run(command)
+    # 不继承终端的标准输入输出（FFmpeg 默认会读取标准输入中的按键），出错时抛出异常
+    subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
 
     return output_audio_path
 
+
+def _extract_audios(in_video_paths, audio_save2_path):
+    """
+    一个 FFmpeg 进程带多个 -i 输入和多个输出，省去每个视频单独启动进程的开销
+    """
+    output_audio_paths = []
+    inputs, outputs = [], []
+    for in_video_path in in_video_paths:
+        output_audio_path = _audio_output_path(in_video_path, audio_save2_path)
+        output_audio_paths.append(output_audio_path)
+        if os.path.exists(output_audio_path):
+            print(output_audio_path, ' already exists !')
+            continue
+        # 第 i 个输入的第一条音频流直接复制到第 i 个输出
+        outputs += ['-map', f'{len(inputs) // 2}:a:0', '-c', 'copy', output_audio_path]
+        inputs += ['-i', in_video_path]
+
+    if inputs:
+        command = ['ffmpeg', '-hide_banner', '-loglevel', 'error'] + inputs + outputs
+        subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
+
+    return output_audio_paths
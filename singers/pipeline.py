@@ -1,19 +1,28 @@
 import os
 
-from video_process import canny_video, convert_to_x264, combine_video_audio
-from getmp3 import extract_audio
+from video_process import canny_video_ffmpeg, canny_video_with_audio
 
 
-def pipeline(video_path, video_save2_path='videos'):
+def pipeline(video_path, video_save2_path='videos', use_ffmpeg_filter=False):
+    """
+    一次处理得到最终视频：边缘检测后的帧直接交给 FFmpeg 编码为 H.264，并复制源视频的音频
+    :param use_ffmpeg_filter: 是否用 FFmpeg 的 edgedetect 滤镜完成边缘检测（效果与 OpenCV Canny 略有差异）
+    """
     os.makedirs(video_save2_path, exist_ok=True)
     os.makedirs(os.path.join(video_save2_path, 'processed'), exist_ok=True)
     if os.path.exists(video_path):
         video_name = os.path.split(video_path)[-1]
         video_dir = os.path.dirname(video_path)
-        audio_out = extract_audio(video_path)
-        canny_out = canny_video(video_name, video_dir)
-        convert_out = convert_to_x264(canny_out)
-        combine_video_audio(convert_out, audio_out)
+        current_dir = os.path.dirname(os.path.realpath(__file__))
+        output_video = os.path.join(current_dir, 'videos', video_name.split('.')[0] + '-final.mp4')
+        if os.path.exists(output_video):
+            print(f'{output_video} already exists !')
+            return None
+        if use_ffmpeg_filter:
+            canny_video_ffmpeg(video_name, video_dir, output_video)
+        else:
+            canny_video_with_audio(video_name, video_dir, output_video)
+        print('Finished.')
         return None
     else:
         print('No such video:', video_path)
@@ -3,6 +3,89 @@ import platform
 import subprocess
 
 import cv2
+import numpy as np
+
+# 每帧需要清零的区域 (y0, y1, x0, x1)，用于遮挡台标、字幕等
+MASK_REGIONS = ((70, 160, 80, 210), (30, 80, 1650, 1870), (700, 1000, 1580, 1870))
+# Canny 边缘检测的低/高阈值
+CANNY_LOW, CANNY_HIGH = 80, 150
+
+
+def _cuda_available():
+    """当前 OpenCV 是否带 CUDA 模块且有可用的 GPU"""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+
+def _region_mask(frame_width, frame_height):
+    """
+    预先构建遮挡掩码：遮挡区域为 0，其余为 255，每帧只需一次 bitwise_and
+    （numpy 切片越界时自动裁剪到画面范围内）
+    """
+    mask = np.full((frame_height, frame_width), 255, np.uint8)
+    for y0, y1, x0, x1 in MASK_REGIONS:
+        mask[y0:y1, x0:x1] = 0
+    return mask
+
+
+def _open_video_writer(video_name_out, fps, frame_size):
+    """
+    打开输出视频写入器：优先硬件加速的 H.264，其次软件 H.264，都不可用时退回 mp4v
+    """
+    candidates = (
+        ('avc1', [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]),
+        ('avc1', []),
+        ('mp4v', []),
+    )
+    for fourcc, params in candidates:
+        writer = cv2.VideoWriter(video_name_out, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size, params)
+        if writer.isOpened():
+            return writer
+    return writer
+
+
+def _canny_frames(cap, frame_width, frame_height):
+    """
+    逐帧产出边缘检测结果（单通道灰度图）：Canny -> 遮挡区域清零 -> 反色(仅 Linux)
+    有可用的 GPU 时在 CUDA 上处理
+    """
+    invert = platform.system() == 'Linux'
+    mask = _region_mask(frame_width, frame_height)
+
+    if _cuda_available():
+        # GPU 处理：检测器和显存缓冲区只创建一次，每帧只上传原图、下载结果
+        print('Using CUDA for Canny.')
+        canny = cv2.cuda.createCannyEdgeDetector(CANNY_LOW, CANNY_HIGH)
+        gpu_frame = cv2.cuda_GpuMat()
+        gpu_mask = cv2.cuda_GpuMat()
+        gpu_mask.upload(mask)
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            gpu_frame.upload(frame)
+            gpu_edges = canny.detect(cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGR2GRAY))
+            gpu_edges = cv2.cuda.bitwise_and(gpu_edges, gpu_mask)
+            if invert:
+                gpu_edges = cv2.cuda.bitwise_not(gpu_edges)
+            yield gpu_edges.download()
+    else:
+        # Read until video is completed
+        while cap.isOpened():
+            # Capture frame-by-frame
+            ret, frame = cap.read()
+            if ret:
+                frame = cv2.Canny(frame, CANNY_LOW, CANNY_HIGH)
+                cv2.bitwise_and(frame, mask, dst=frame)
+                if invert:
+                    cv2.bitwise_not(frame, dst=frame)
+                yield frame
+            # Break the loop
+            else:
+                break
+
 
 def canny_video(video_name, video_path='videos'):
     source = os.path.join(video_path, video_name)
@@ -19,25 +102,11 @@ def canny_video(video_name, video_path='videos'):
         cap.release()
         print(f'{video_name_out} already exists !')
         return video_name_out
-    out_mp4 = cv2.VideoWriter(video_name_out, cv2.VideoWriter_fourcc(*"XVID"), fps, (frame_width, frame_height))
-
-    # Read until video is completed
-    while cap.isOpened():
-        # Capture frame-by-frame
-        ret, frame = cap.read()
-        if ret:
-            # Write the frame to the output files
-            frame = cv2.Canny(frame, 80, 150)
-            frame[70:160, 80:210] = 0
-            frame[30:80, 1650:1870] = 0
-            frame[700:1000, 1580:1870] = 0
-            if platform.system() == 'Linux':
-                frame = cv2.bitwise_not(frame)
-            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
-            out_mp4.write(frame)
-        # Break the loop
-        else:
-            break
+    out_mp4 = _open_video_writer(video_name_out, fps, (frame_width, frame_height))
+
+    for frame in _canny_frames(cap, frame_width, frame_height):
+        # Write the frame to the output files
+        out_mp4.write(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
 
     cap.release()
     out_mp4.release()
@@ -46,6 +115,109 @@ def canny_video(video_name, video_path='videos'):
     return video_name_out
 
 
+def canny_video_with_audio(video_name, video_path, output_video):
+    """
+    边缘检测后的帧以原始灰度数据直接写入 FFmpeg 的标准输入，同时从源视频复制音频，
+    一次得到最终的 H.264+音频文件，省去 canny_video -> convert_to_x264 -> combine_video_audio 的中间文件
+    :param output_video: 最终输出的视频路径
+    :return: 输出视频路径
+    """
+    source = os.path.join(video_path, video_name)
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        print("Error opening video stream or file.")
+
+    frame_width = int(cap.get(3))
+    frame_height = int(cap.get(4))
+    print('Processed video Resolution:', frame_width, 'x', frame_height)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    command = [
+        'ffmpeg',
+        '-y',  # 覆盖输出文件无需确认
+        '-hide_banner',  # 隐藏FFmpeg欢迎信息
+        '-loglevel', 'error',  # 只显示错误日志
+        # 输入0：标准输入中的原始灰度帧（比 BGR 少传 2/3 的数据）
+        '-f', 'rawvideo', '-pixel_format', 'gray', '-video_size', f'{frame_width}x{frame_height}', '-framerate', str(fps), '-i', '-',
+        # 输入1：源视频，只取其音频
+        '-i', source,
+        '-map', '0:v', '-map', '1:a:0?',
+        '-c:v', 'libx264', '-preset', 'fast', '-pix_fmt', 'yuv420p',
+        '-c:a', 'copy',
+        '-shortest',
+        output_video,
+    ]
+    proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    try:
+        for frame in _canny_frames(cap, frame_width, frame_height):
+            proc.stdin.write(frame.data)
+    except BrokenPipeError:
+        print('FFmpeg 提前退出，停止写入帧。')
+    finally:
+        cap.release()
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+    if proc.wait() != 0:
+        print(f'错误：FFmpeg 编码失败（返回码 {proc.returncode}）！')
+    else:
+        print('Processed video saved as', output_video, '.')
+
+    return output_video
+
+
+def _ffmpeg_canny_filter():
+    """
+    与 canny_video 逐帧处理等价的 FFmpeg 滤镜链：edgedetect(canny) -> drawbox 涂黑遮挡区域 -> negate(仅 Linux)
+    edgedetect 的阈值是 0~1 的比例，由 OpenCV 的 0~255 阈值换算
+    """
+    filters = [f'edgedetect=mode=wires:low={CANNY_LOW / 255:.4f}:high={CANNY_HIGH / 255:.4f}']
+    for y0, y1, x0, x1 in MASK_REGIONS:
+        # drawbox 超出画面的部分会自动裁剪
+        filters.append(f'drawbox=x={x0}:y={y0}:w={x1 - x0}:h={y1 - y0}:color=black@1:t=fill')
+    if platform.system() == 'Linux':
+        filters.append('negate')
+    return ','.join(filters)
+
+
+def canny_video_ffmpeg(video_name, video_path='videos', output_video=None):
+    """
+    用一次 FFmpeg 调用完成边缘检测并直接编码为 H.264，代替 canny_video + convert_to_x264，
+    整个处理在 FFmpeg 的 C 代码中完成，不经过 Python 逐帧循环和中间的 XVID 编码
+    :param output_video: 最终输出路径；指定时同时复制源视频的音频，一次得到最终文件
+    :return: H.264 视频路径（未指定 output_video 时与 convert_to_x264 的输出同名，可直接交给 combine_video_audio）
+    """
+    source = os.path.join(video_path, video_name)
+    with_audio = output_video is not None
+    if not with_audio:
+        current_dir = os.path.dirname(os.path.realpath(__file__))
+        output_video = os.path.join(current_dir, 'videos', 'processed', 'canny-' + video_name.split('.')[0] + '-x264.mp4')
+    if os.path.exists(output_video):
+        print(f'{output_video} already exists !')
+        return output_video
+    command = [
+        'ffmpeg',
+        '-y',  # 覆盖输出文件无需确认
+        '-i', source,  # 输入文件
+        '-vf', _ffmpeg_canny_filter(),  # 边缘检测滤镜链
+        *(['-map', '0:v:0', '-map', '0:a:0?', '-c:a', 'copy'] if with_audio else ['-an']),  # 直接复制音频，或不输出音频由 combine_video_audio 合并
+        '-c:v', 'libx264',  # 视频编码器
+        '-preset', 'fast',
+        '-pix_fmt', 'yuv420p',  # edgedetect 输出灰度，转为播放器通用的像素格式
+        output_video,  # 输出文件
+        '-hide_banner',  # 隐藏FFmpeg欢迎信息
+        '-loglevel', 'error'  # 只显示错误日志
+    ]
+
+    result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        print(f"错误：边缘检测失败！FFmpeg输出：\n{result.stderr}")
+    else:
+        print('Processed video saved as', output_video, '.')
+
+    return output_video
+
+
 def convert_to_x264(input_from_canny_video):
     """
     subprocess.run('ffmpeg -y -i "output.mp4" -c:v libx264 "output.mp4"  -hide_banner -loglevel error')
@@ -71,7 +243,7 @@ def convert_to_x264(input_from_canny_video):
     ]
 
     # 执行命令
-    result = subprocess.run(command, capture_output=True, text=True)
+    result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
 
     # 检查错误
     if result.returncode != 0:
@@ -105,6 +277,6 @@ def combine_video_audio(input_from_convert2x264, input_from_extract_audio, outpu
         '-loglevel', 'error'  # 只显示错误日志
     ]
 
-    subprocess.run(cmd, check=True)
+    subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
     print('Finished.')
     return None
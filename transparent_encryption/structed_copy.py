@@ -1,8 +1,12 @@
 import os
-import shutil
+import re
 import fnmatch
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
+
+from folders_files.utiles import fast_copy
 
 # --- 配置日志 ---
 logging.basicConfig(
@@ -30,23 +34,50 @@ def load_patterns_from_file(file_path):
     return patterns
 
 
+@lru_cache(maxsize=None)
+def _translate(pattern):
+    """
+    把单条通配规则翻译成正则表达式文本，相同规则（如 *.py）整个运行期间只翻译一次。
+    """
+    return fnmatch.translate(os.path.normcase(pattern))
+
+
+@lru_cache(maxsize=None)
+def compile_patterns(patterns):
+    """
+    把一组规则（tuple）合并编译成一个正则表达式，匹配任意一条规则即匹配。
+    继承了相同规则的目录共用同一个编译结果。
+    """
+    if not patterns:
+        return re.compile('(?!)')  # 没有规则时任何文件名都不匹配
+    return re.compile('|'.join(f'(?:{_translate(p)})' for p in patterns))
+
+
 def is_match(filename, patterns):
     """
-    检查文件名是否匹配当前累积的任意规则。
+    检查文件名是否匹配当前累积的任意规则（与逐条 fnmatch.fnmatch 结果相同）。
+    """
+    return compile_patterns(tuple(patterns)).match(os.path.normcase(filename)) is not None
+
+
+def _copy_one(src_file, dst_file_dir, dst_file):
+    """
+    在线程池中执行的单个文件复制（makedirs 的 exist_ok 可安全地被多个线程同时调用）。
     """
-    for pattern in patterns:
-        if fnmatch.fnmatch(filename, pattern):
-            return True
-    return False
+    os.makedirs(dst_file_dir, exist_ok=True)
+    fast_copy(src_file, dst_file, copy_metadata=True)
 
 
-def copy_selected_files(src_root, dst_root, rule_filename='.gitattributes', tolerance=True):
+def copy_selected_files(src_root, dst_root, rule_filename='.gitattributes', tolerance=True, max_workers=None):
     """
     核心函数：支持规则继承的复制工具。
 
     逻辑：
     1. 使用 rule_cache 字典存储 { '目录绝对路径': [该目录及其父级的所有规则] }
     2. os.walk 默认从顶层向下遍历，确保我们处理子目录时，父目录的规则已存在缓存中。
+    3. 遍历线程只负责匹配规则，复制任务交给线程池并发执行，多个复制同时占用磁盘队列。
+
+    max_workers: 复制线程数（None=CPU核数*4，最多32）
     """
 
     stats = {'copied': 0, 'skipped': 0, 'errors': 0}
@@ -79,76 +110,89 @@ def copy_selected_files(src_root, dst_root, rule_filename='.gitattributes', tole
     # 规则缓存字典：Key=目录路径, Value=规则列表
     rule_cache = {}
 
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    # 已提交的复制任务：Key=future, Value=源文件路径
+    futures = {}
+
+    # os.walk 产出的路径都是 src_root 加上子路径拼接而成，截掉这个前缀即得相对路径
+    prefix_len = len(os.path.join(src_root, ''))
+
     # 遍历目录树 (topdown=True 是默认值，这对继承逻辑至关重要)
+    # src_root 已是绝对路径，os.walk 产出的 current_root 也都是规范的绝对路径，可直接作为缓存键
     for current_root, dirs, files in os.walk(src_root):
-        current_root_abs = os.path.abspath(current_root)
-
         # --- 1. 计算当前目录的有效规则 (继承 + 本地) ---
 
         # A. 获取父级规则
         parent_patterns = []
-        if current_root_abs != src_root:
+        if current_root != src_root:
             # 如果不是根目录，则查找父目录的规则
-            parent_dir = os.path.dirname(current_root_abs)
+            parent_dir = os.path.dirname(current_root)
             # 从缓存中获取父级规则（因为是 topdown 遍历，父级一定已经被处理过）
             parent_patterns = rule_cache.get(parent_dir, [])
 
-        # B. 获取本地规则
-        local_rule_file = os.path.join(current_root, rule_filename)
-        local_patterns = load_patterns_from_file(local_rule_file)
+        # B. 获取本地规则（文件列表中没有规则文件时无需再访问磁盘）
+        local_patterns = []
+        if rule_filename in files:
+            local_patterns = load_patterns_from_file(os.path.join(current_root, rule_filename))
 
         # C. 合并规则 (父级规则 + 本地规则)
         # 这里简单的列表相加即可，子级规则追加在后
-        effective_patterns = parent_patterns + local_patterns
+        effective_patterns = parent_patterns + local_patterns if local_patterns else parent_patterns
 
         # D. 存入缓存，供更深层的子目录使用
-        rule_cache[current_root_abs] = effective_patterns
+        rule_cache[current_root] = effective_patterns
 
         # --- 2. 处理文件复制 ---
 
-        # 计算相对路径，用于在目标目录重建结构
-        rel_path = os.path.relpath(current_root, src_root)
-
         # 如果当前目录（包含继承的）没有任何规则，且也不包含在默认策略里，则跳过该目录下所有文件
         if not effective_patterns:
             stats['skipped'] += len(files)
             continue
 
+        # 每个目录只取一次合并后的正则，逐个文件直接匹配
+        matcher = compile_patterns(tuple(effective_patterns))
+
+        # 目标目录每个源目录只计算一次，用于在目标目录重建结构
+        rel_path = current_root[prefix_len:]
+        dst_file_dir = os.path.join(dst_root, rel_path) if rel_path else dst_root
+
         for filename in files:
             # 跳过规则文件本身（可选）
             if filename == rule_filename:
                 continue
 
             # 检查匹配 (使用合并后的 effective_patterns)
-            if is_match(filename, effective_patterns):
+            if matcher.match(os.path.normcase(filename)) is not None:
                 src_file = os.path.join(current_root, filename)
-
-                # 构建目标路径
-                if rel_path == '.':
-                    dst_file_dir = dst_root
-                else:
-                    dst_file_dir = os.path.join(dst_root, rel_path)
-
                 dst_file = os.path.join(dst_file_dir, filename)
-
-                try:
-                    os.makedirs(dst_file_dir, exist_ok=True)
-                    shutil.copy2(src_file, dst_file)
-                    # 只有在详细模式下才打印每个文件，避免日志过多
-                    # logging.info(f"复制: {filename}")
-                    stats['copied'] += 1
-
-                except Exception as e:
-                    stats['errors'] += 1
-                    msg = f"复制出错: {src_file} -> {e}"
-                    if tolerance:
-                        logging.warning(msg + " (已容忍跳过)")
-                    else:
-                        logging.error(msg)
-                        raise e
+                futures[executor.submit(_copy_one, src_file, dst_file_dir, dst_file)] = src_file
             else:
                 stats['skipped'] += 1
 
+    # 汇总复制结果
+    try:
+        for future in as_completed(futures):
+            try:
+                future.result()
+                # 只有在详细模式下才打印每个文件，避免日志过多
+                # logging.info(f"复制: {futures[future]}")
+                stats['copied'] += 1
+
+            except Exception as e:
+                stats['errors'] += 1
+                msg = f"复制出错: {futures[future]} -> {e}"
+                if tolerance:
+                    logging.warning(msg + " (已容忍跳过)")
+                else:
+                    logging.error(msg)
+                    # 取消尚未开始的复制任务
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise e
+    finally:
+        executor.shutdown()
+
     logging.info("-" * 30)
     logging.info(f"任务结束。统计结果：")
     logging.info(f"  [√] 成功复制: {stats['copied']} 个文件")
@@ -1,80 +1,269 @@
 import base64
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
+import mmap
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.padding import PKCS7
 import os
+import queue
+import threading
 
 from video_crypt.key_manager import load_key
 from video_crypt.utils import string_to_hash
 
+# AES 分组长度（字节）
+AES_BLOCK_SIZE = 16
+# CTR 格式加密文件的文件头标识；没有该标识的是旧版 CBC 格式文件
+CTR_FILE_MAGIC = b'VCRYCTR1'
+# 文件内容每次读写的字节数（与常见的文件系统预读窗口相当，流水线中每个文件最多占用 2*PIPELINE_DEPTH 块）
+CHUNK_BYTES = 1024 * 1024
+# 内容超过该大小时把输入输出文件映射到内存处理，以及每次处理的映射分片大小
+MMAP_THRESHOLD = 64 * 1024 * 1024
+MMAP_TILE_BYTES = 16 * 1024 * 1024
+# 读写流水线每段之间最多排队的分块数
+PIPELINE_DEPTH = 3
 
-def encrypt_file_with_name(input_path, output_path, key, chunk_size=1024):
+
+def _aes_cbc(key, iv):
+    """AES-CBC 密码对象（OpenSSL 后端，自动使用 AES-NI）"""
+    return Cipher(algorithms.AES(key), modes.CBC(iv))
+
+
+def _aes_ctr(key, nonce):
+    """AES-CTR 密码对象：各分组可并行计算，密文与明文等长，无需填充"""
+    return Cipher(algorithms.AES(key), modes.CTR(nonce))
+
+
+def _advise_sequential(f):
+    """提示内核按顺序读取该文件，加大预读（仅 Linux 等支持 posix_fadvise 的系统）"""
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+
+def _stream_ctr(ctx, fin, fout, chunk_bytes):
+    """读入预分配缓冲区，经 CTR 加密/解密器处理后写出，循环中不再分配新的块"""
+    buf = bytearray(chunk_bytes)
+    out = bytearray(chunk_bytes + AES_BLOCK_SIZE - 1)  # update_into 要求输出缓冲区多留 分组长度-1 字节
+    with memoryview(buf) as src, memoryview(out) as dst:
+        while n := fin.readinto(buf):
+            fout.write(dst[:ctx.update_into(src[:n], out)])
+    fout.write(ctx.finalize())
+
+
+def _pipelined_ctr(ctx, fin, fout, chunk_bytes, depth=PIPELINE_DEPTH):
+    """
+    读、加密/解密、写三段流水线：读线程和写线程各占一段，当前线程只做 CTR 运算
+    读第 N+1 块、处理第 N 块、写第 N-1 块同时进行（文件读写和 OpenSSL 运算都会释放 GIL）
+    各段之间用容量为 depth 的有界队列衔接，缓冲区循环复用，单个文件最多占用 2*depth 个分块的内存
+    """
+    in_bufs = [bytearray(chunk_bytes) for _ in range(depth)]
+    out_bufs = [bytearray(chunk_bytes + AES_BLOCK_SIZE - 1) for _ in range(depth)]
+    free_in, filled = queue.Queue(), queue.Queue(maxsize=depth)
+    free_out, to_write = queue.Queue(), queue.Queue(maxsize=depth)
+    for i in range(depth):
+        free_in.put(i)
+        free_out.put(i)
+    errors = []
+
+    def reader():
+        try:
+            while True:
+                i = free_in.get()
+                if i is None:
+                    return
+                n = fin.readinto(in_bufs[i])
+                filled.put((i, n))
+                if not n:
+                    return
+        except BaseException as e:
+            errors.append(e)
+            filled.put((None, 0))
+
+    def writer():
+        while (item := to_write.get()) is not None:
+            i, n = item
+            if not errors:
+                try:
+                    fout.write(memoryview(out_bufs[i])[:n])
+                except BaseException as e:
+                    errors.append(e)
+            free_out.put(i)
+
+    read_thread = threading.Thread(target=reader, daemon=True)
+    write_thread = threading.Thread(target=writer, daemon=True)
+    read_thread.start()
+    write_thread.start()
+    try:
+        while not errors:
+            i, n = filled.get()
+            if not n:
+                break
+            j = free_out.get()
+            m = ctx.update_into(memoryview(in_bufs[i])[:n], out_bufs[j])
+            free_in.put(i)
+            to_write.put((j, m))
+    finally:
+        # 通知读线程、写线程退出，写线程会先写完队列中剩余的块
+        free_in.put(None)
+        to_write.put(None)
+        read_thread.join()
+        write_thread.join()
+    if errors:
+        raise errors[0]
+    fout.write(ctx.finalize())
+
+
+def _mmap_ctr(ctx, fin, fout, size, tile_bytes=MMAP_TILE_BYTES):
+    """
+    输入、输出文件都映射到内存，update_into 直接从输入映射加密/解密到输出映射，不经过 Python bytes
+    输入从 fin 当前位置开始，输出从 fout 当前位置开始，共 size 字节（共享映射要求 fout 以读写模式打开）
+    """
+    in_offset = fin.tell()
+    fout.flush()
+    out_offset = fout.tell()
+    os.ftruncate(fout.fileno(), out_offset + size)
+    with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as src_map, \
+            mmap.mmap(fout.fileno(), 0, access=mmap.ACCESS_WRITE) as dst_map, \
+            memoryview(src_map) as src, memoryview(dst_map) as dst:
+        for i in range(0, size, tile_bytes):
+            n = min(tile_bytes, size - i)
+            ctx.update_into(src[in_offset + i:in_offset + i + n], dst[out_offset + i:out_offset + i + n])
+    ctx.finalize()
+
+
+def _crypt_ctr(ctx, fin, fout, chunk_bytes):
+    """CTR 加密/解密 fin 剩余的全部内容：大文件走内存映射，多个分块的文件走读写流水线，单个分块直接读写"""
+    size = os.fstat(fin.fileno()).st_size - fin.tell()
+    if size > MMAP_THRESHOLD:
+        _mmap_ctr(ctx, fin, fout, size)
+    elif size > chunk_bytes:
+        _pipelined_ctr(ctx, fin, fout, chunk_bytes)
+    else:
+        _stream_ctr(ctx, fin, fout, chunk_bytes)
+
+
+def _cbc_encrypt(key, iv, data):
+    """PKCS7 填充后一次性加密较短的数据（文件名、文件夹名）"""
+    padder = PKCS7(AES_BLOCK_SIZE * 8).padder()
+    encryptor = _aes_cbc(key, iv).encryptor()
+    return encryptor.update(padder.update(data) + padder.finalize()) + encryptor.finalize()
+
+
+def _cbc_decrypt(key, iv, data):
+    """一次性解密较短的数据并去除 PKCS7 填充"""
+    decryptor = _aes_cbc(key, iv).decryptor()
+    unpadder = PKCS7(AES_BLOCK_SIZE * 8).unpadder()
+    return unpadder.update(decryptor.update(data) + decryptor.finalize()) + unpadder.finalize()
+
+
+def encrypted_file_size(original_name, content_size):
+    """encrypt_file_with_name 输出文件的大小：文件头（含 PKCS7 填充后的加密文件名）+ 与明文等长的 CTR 密文"""
+    padded_name_len = (len(original_name.encode('utf-8')) // AES_BLOCK_SIZE + 1) * AES_BLOCK_SIZE
+    return len(CTR_FILE_MAGIC) + 2 * AES_BLOCK_SIZE + 2 + padded_name_len + content_size
+
+
+def encrypt_file_with_name(input_path, output_path, key, chunk_bytes=CHUNK_BYTES):
     """
     加密文件（包含文件名加密）
-    :param chunk_size:
+    :param chunk_bytes: 每次读写的字节数（默认1MB）
     :param input_path: 输入文件路径
     :param output_path: 输出加密文件路径（固定后缀为.bin）
     :param key: 加密密钥（32字节用于AES-256）
     """
     # 获取原始文件名并加密
     original_name = os.path.basename(input_path)
-    name_cipher = AES.new(key, AES.MODE_CBC, iv=os.urandom(16))
-    encrypted_name = name_cipher.encrypt(pad(original_name.encode('utf-8'), AES.block_size))
+    name_iv = os.urandom(AES_BLOCK_SIZE)
+    encrypted_name = _cbc_encrypt(key, name_iv, original_name.encode('utf-8'))
 
-    # 文件内容加密
-    content_cipher = AES.new(key, AES.MODE_CBC)
-    iv = content_cipher.iv
+    # 文件内容加密（CTR 模式，加密器只创建一次，分块流式加密）
+    nonce = os.urandom(AES_BLOCK_SIZE)
+    encryptor = _aes_ctr(key, nonce).encryptor()
 
     # abs_dir_path = os.path.dirname(os.path.abspath(__file__))
     # output_path = os.path.join(abs_dir_path, 'encrypted-videos')
     # os.makedirs(output_path, exist_ok=True)
     # output_path = os.path.join(output_path, '.bin')
 
-    with open(input_path, 'rb') as fin, open(output_path, 'wb') as fout:
-        # 写入文件头结构：[IV(16B)]*2[加密文件名长度(2B)][加密文件名][加密内容]
-        fout.write(iv)
-        fout.write(name_cipher.iv)  # 文件名加密的IV
+    with open(input_path, 'rb', buffering=0) as fin, open(output_path, 'w+b') as fout:
+        _advise_sequential(fin)
+        # 写入文件头结构：[标识(8B)][nonce(16B)][文件名IV(16B)][加密文件名长度(2B)][加密文件名][加密内容]
+        fout.write(CTR_FILE_MAGIC)
+        fout.write(nonce)
+        fout.write(name_iv)  # 文件名加密的IV
         fout.write(len(encrypted_name).to_bytes(2, 'big'))
         fout.write(encrypted_name)
 
         # 加密并写入文件内容
-        while chunk := fin.read(chunk_size * chunk_size):  # 1MB分块
-            if len(chunk) % AES.block_size != 0:
-                chunk = pad(chunk, AES.block_size)
-            fout.write(content_cipher.encrypt(chunk))
+        _crypt_ctr(encryptor, fin, fout, chunk_bytes)
 
 
-def decrypt_file_with_name(input_path, output_dir, key, chunk_size=1024):
+def decrypt_file_with_name(input_path, output_dir, key, chunk_bytes=CHUNK_BYTES):
     """
     解密文件（包含文件名解密）
-    :param chunk_size:
+    :param chunk_bytes: 每次读写的字节数（默认1MB）
     :param input_path: 加密文件路径
     :param output_dir: 解密文件输出目录
     :param key: 加密密钥
     """
-    with open(input_path, 'rb') as fin:
-        # 读取文件头
-        content_iv = fin.read(16)
+    with open(input_path, 'rb', buffering=0) as fin:
+        _advise_sequential(fin)
+        # 读取文件头，根据标识区分 CTR 格式和旧版 CBC 格式（[IV(16B)]*2 开头）
+        magic = fin.read(len(CTR_FILE_MAGIC))
+        is_ctr = magic == CTR_FILE_MAGIC
+        content_iv = fin.read(16) if is_ctr else magic + fin.read(16 - len(magic))
         name_iv = fin.read(16)
         name_len = int.from_bytes(fin.read(2), 'big')
         encrypted_name = fin.read(name_len)
 
         # 解密文件名
-        name_cipher = AES.new(key, AES.MODE_CBC, iv=name_iv)
-        original_name = unpad(name_cipher.decrypt(encrypted_name), AES.block_size).decode('utf-8')
+        original_name = _cbc_decrypt(key, name_iv, encrypted_name).decode('utf-8')
 
-        # 解密内容
-        content_cipher = AES.new(key, AES.MODE_CBC, iv=content_iv)
+        # 解密内容：先写入临时文件，成功后再改名，解密失败时不会留下不完整的明文文件
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, original_name)
+        tmp_path = output_path + '.part'
+
+        try:
+            with open(tmp_path, 'w+b') as fout:
+                if is_ctr:
+                    # CTR 模式密文与明文等长，直接流式解密
+                    _crypt_ctr(_aes_ctr(key, content_iv).decryptor(), fin, fout, chunk_bytes)
+                else:
+                    _decrypt_legacy_cbc(_aes_cbc(key, content_iv).decryptor(), fin, fout, chunk_bytes)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
 
-        with open(output_path, 'wb') as fout:
-            while chunk := fin.read(chunk_size * chunk_size):
-                decrypted = content_cipher.decrypt(chunk)
-                fout.write(decrypted)
 
-            # 移除最后一个块的填充
-            fout.seek(-decrypted[-1], 2)
-            fout.truncate()
+def _decrypt_legacy_cbc(decryptor, fin, fout, chunk_bytes):
+    """
+    解密旧版 CBC 格式的文件内容。旧版加密只在明文长度不是 16 的倍数时才填充，
+    因此最后一个分组单独处理：PKCS7 校验通过则去除填充，否则说明原文恰好对齐、没有填充，原样写出
+    """
+    # 始终保留最后一个已解密的分组，其余部分边解密边写出
+    pending = b''
+    while chunk := fin.read(chunk_bytes):
+        out = decryptor.update(chunk)
+        if len(out) >= AES_BLOCK_SIZE:
+            fout.write(pending)
+            fout.write(memoryview(out)[:-AES_BLOCK_SIZE])
+            pending = out[-AES_BLOCK_SIZE:]
+        else:
+            pending += out
+    pending += decryptor.finalize()
+    fout.write(pending[:-AES_BLOCK_SIZE])
+    last_block = pending[-AES_BLOCK_SIZE:]
+    if not last_block:
+        return  # 空文件
+
+    unpadder = PKCS7(AES_BLOCK_SIZE * 8).unpadder()
+    try:
+        last_block = unpadder.update(last_block) + unpadder.finalize()
+    except ValueError:
+        pass  # 填充无效：原文长度是 16 的倍数，加密时没有填充
+    fout.write(last_block)
 
 
 def encrypt_folder_name(folder_name, key):
@@ -85,13 +274,12 @@ def encrypt_folder_name(folder_name, key):
     :return: 固定长度的安全Base64字符串（无等号，特殊字符已替换）
     """
     # 生成随机IV
-    iv = os.urandom(AES.block_size)
-    cipher = AES.new(key, AES.MODE_CBC, iv)
+    iv = os.urandom(AES_BLOCK_SIZE)
 
     # 加密并添加填充
     if len(folder_name) > 30:
         folder_name = folder_name[:30]
-    encrypted = cipher.encrypt(pad(folder_name.encode('utf-8'), AES.block_size))
+    encrypted = _cbc_encrypt(key, iv, folder_name.encode('utf-8'))
 
     # 组合IV和密文
     combined = iv + encrypted
@@ -117,18 +305,21 @@ def decrypt_folder_name(encrypted_str, key):
     combined = base64.b64decode(restored + padding)
 
     # 分离IV和密文
-    iv = combined[:AES.block_size]
-    encrypted = combined[AES.block_size:]
+    iv = combined[:AES_BLOCK_SIZE]
+    encrypted = combined[AES_BLOCK_SIZE:]
 
     # 解密
-    cipher = AES.new(key, AES.MODE_CBC, iv)
-    decrypted = unpad(cipher.decrypt(encrypted), AES.block_size)
+    decrypted = _cbc_decrypt(key, iv, encrypted)
 
     return decrypted.decode('utf-8')
 
 
 if __name__ == '__main__':
     import time
+    from cryptography.hazmat.backends.openssl.backend import backend
+
+    # 加密运算由 OpenSSL 完成（1.1 及以上版本在支持的 CPU 上使用 AES-NI/VAES）
+    print(f"加密后端：{backend.openssl_version_text()}")
 
     # 使用示例
     key = load_key()
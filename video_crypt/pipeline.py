@@ -1,14 +1,56 @@
+import json
+import multiprocessing
 import os
-import shutil
 
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 
-from video_preview.generate_video_preview import generate_video_preview, is_video_file
+from folders_files.utiles import iter_tree, fast_copy
+from video_preview.generate_video_preview import generate_video_preview, is_video_file, PREVIEW_DECODE_WORKERS
 
-from video_crypt.crypt import encrypt_folder_name, decrypt_folder_name, encrypt_file_with_name, decrypt_file_with_name
+from video_crypt.crypt import encrypt_folder_name, decrypt_folder_name, encrypt_file_with_name, decrypt_file_with_name, \
+    encrypted_file_size
 from video_crypt.key_manager import load_key
-from video_crypt.utils import string_to_hash
+from video_crypt.utils import strings_to_hashes
+
+# 每个映射目录中记录 {原文件名: 加密文件名} 的索引文件名
+MAPPING_INDEX_NAME = '_index.json'
+# 多线程模式下每完成多少个文件更新一次进度条
+PBAR_BATCH = 32
+
+# 进程池工作进程中的密钥，由 _init_worker_key 在进程启动时设置一次
+_worker_key = None
+
+
+def _crypt_mp_context():
+    """加密进程池的启动方式：优先 forkserver，不支持的平台（如 Windows）用 spawn"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def _init_worker_key(key):
+    """进程池初始化函数：每个工作进程只接收一次密钥，之后的任务不再传递"""
+    global _worker_key
+    _worker_key = key
+
+
+def _is_up_to_date(src_file, dst_file, orig_name):
+    """加密目标已存在、大小与本次加密结果相同且不早于源文件修改时间时视为无需重新加密（与 rsync 的判断方式相同）"""
+    try:
+        dst_stat = os.stat(dst_file)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src_file)
+    return (dst_stat.st_size == encrypted_file_size(orig_name, src_stat.st_size)
+            and dst_stat.st_mtime >= src_stat.st_mtime)
+
+
+def _crypt_file(src_file, dst_file, encrypt):
+    """在进程池工作进程中加密/解密单个文件"""
+    if encrypt:
+        encrypt_file_with_name(src_file, dst_file, _worker_key)
+    else:
+        decrypt_file_with_name(src_file, os.path.dirname(dst_file), _worker_key)
 
 
 def mediatranscryption(
@@ -27,6 +69,8 @@ def mediatranscryption(
         preview_width=1980,
         previewOnly=False,
         detached_prevew=None,
+        use_processes=False,
+        incremental=False,
 ):
     """
     遍历目录并加密/解密文件，支持删除源文件、多线程、保存文件名映射。
@@ -43,58 +87,103 @@ def mediatranscryption(
     :param cols: 预览图列数
     :param preview_width: 预览图的像素宽度，高度自动调整
     :param previewOnly: 只输出preview@文件夹,不输出加密文件
+    :param logging: 是否在映射目录中记录文件名映射（每个映射目录一个 _index.json：{原文件名: 加密文件名}）
+    :param use_processes: 文件内容的加密/解密放到进程池中执行（每个 CPU 核一个进程），
+                          映射、预览图、删除源文件等仍在线程中完成；工作进程以 forkserver/spawn 方式启动，
+                          调用脚本需放在 if __name__ == "__main__": 下
+    :param incremental: 增量加密：目标目录中已有且未过期的加密文件不再重新加密（也不重新复制原图、生成预览图），
+                        文件名映射仍照常记录；只对加密有效
     """
     dir_map = {}
     mapping_dir_map = {}
+    # 密钥只读取一次，所有文件和目录名的加密/解密共用
+    key = load_key()
 
     # 如果需要保存映射，生成映射目录路径
     mapping_root = dst_dir  # + "_mapping" if save_mapping else None
+    # 各映射目录的文件名映射 {映射目录: {原文件名: 加密文件名}}，全部处理完后每个目录写一次索引文件
+    # （setdefault 和字典赋值都是原子操作，多个线程可直接写入）
+    mapping_logs = {}
 
-    def count_valid_tasks(src_dir):
-        total_tasks = 0
-        for root, dirs, files in os.walk(src_dir):
-            # 关键修改：原地移除所有含@的目录，阻止os.walk进入这些目录
-            if not encrypt:
-                dirs[:] = [d for d in dirs if '@' not in d]
+    def write_mapping_logs():
+        """
+        每个映射目录写一个 JSON 索引，代替每个文件一个 .log 文件；
+        多次运行共用同一映射目录时合并到已有索引中，先写临时文件再替换，中途出错也不会损坏原索引
+        """
+        for map_dir, names in mapping_logs.items():
+            index_path = os.path.join(map_dir, MAPPING_INDEX_NAME)
+            try:
+                with open(index_path, "r", encoding="utf-8") as index_f:
+                    merged = json.load(index_f)
+            except FileNotFoundError:
+                merged = {}
+            except ValueError as e:
+                print(f"映射索引无法解析，将重新生成: {index_path} ({e})")
+                merged = {}
+            merged.update(names)
 
-            # 统计当前目录的有效内容（已过滤掉@目录）
-            valid_dirs = len(dirs)  # 因为dirs已经被过滤，直接取长度即可
-            valid_files = len([f for f in files if not f.startswith('.')])
-            total_tasks += valid_dirs + valid_files
+            tmp_path = index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as index_f:
+                json.dump(merged, index_f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, index_path)
 
-        return total_tasks
-    # 统计总任务数（排除隐藏文件）
-    total_tasks = count_valid_tasks(src_dir)
+    # 增量加密时目标目录中已有的加密子目录 {目标父目录: {解密后的目录名: [加密目录名, ...]}}
+    existing_dirs = {}
+
+    def find_existing_dir(parent_new, dir_name):
+        """
+        目录名每次加密的结果都不同（随机IV），增量加密时沿用上次为该目录生成的加密目录名，
+        否则其中的文件都会被当作新文件重新加密；每个已有目录只分配给一个源目录
+        """
+        names = existing_dirs.get(parent_new)
+        if names is None:
+            names = existing_dirs[parent_new] = {}
+            try:
+                with os.scandir(parent_new) as entries:
+                    for entry in entries:
+                        if not entry.is_dir():
+                            continue
+                        try:
+                            plain = decrypt_folder_name(entry.name, key)
+                        except Exception:  # 不是用该密钥加密的目录名
+                            continue
+                        names.setdefault(plain, []).append(entry.name)
+            except FileNotFoundError:
+                pass
+        # 加密前目录名被截断为30个字符，解密结果也是截断后的名字
+        candidates = names.get(dir_name[:30])
+        return candidates.pop() if candidates else None
+
+    # 多线程处理多个文件时每个预览图只用一个解码器，避免线程数成倍增加
+    preview_decode_workers = 1 if use_multithreading else PREVIEW_DECODE_WORKERS
 
     def process_file(src_file, dst_file, encrypt, delete_source, map_dir, orig_name, enc_name):
         """单个文件处理函数"""
-        if encrypt:
+        up_to_date = incremental and encrypt and not previewOnly and _is_up_to_date(src_file, dst_file, orig_name)
+
+        if up_to_date:
+            pass
+        elif crypt_executor is not None:
+            if not (encrypt and previewOnly):
+                crypt_executor.submit(_crypt_file, src_file, dst_file, encrypt).result()
+        elif encrypt:
             if not previewOnly:
-                encrypt_file_with_name(src_file, dst_file, load_key())
+                encrypt_file_with_name(src_file, dst_file, key)
         else:
-            decrypt_file_with_name(src_file, os.path.dirname(dst_file), load_key())
+            decrypt_file_with_name(src_file, os.path.dirname(dst_file), key)
 
         if save_mapping and map_dir:
             # 如果 mapping_pictures 为真，则mapping图像源文件
-            if mapping_pictures:
-                if is_video_file(src_file):
-                    log_path = os.path.join(map_dir, f"{orig_name}.log")
-                    if logging:
-                        with open(log_path, "w", encoding="utf-8") as log_f:
-                            log_f.write(enc_name)
-                else:
-                    # 否则保存原始文件
-                    file_path = os.path.join(map_dir, f"{enc_name}-{orig_name}")
-                    shutil.copyfile(src_file, file_path)
-            else:
-
-                log_path = os.path.join(map_dir, f"{orig_name}.log")
-                if logging:
-                    with open(log_path, "w", encoding="utf-8") as log_f:
-                        log_f.write(enc_name)
+            if mapping_pictures and not is_video_file(src_file):
+                # 否则保存原始文件
+                if not up_to_date:
+                    fast_copy(src_file, f"{map_dir}{os.sep}{enc_name}-{orig_name}")
+            elif logging:
+                mapping_logs.setdefault(map_dir, {})[orig_name] = enc_name
 
-        if save_preview and encrypt and map_dir:
-            generate_video_preview(src_file, os.path.join(map_dir, f"{enc_name}-{orig_name}.png"), rows=rows, cols=cols, preview_width=preview_width)
+        if save_preview and encrypt and map_dir and not up_to_date:
+            generate_video_preview(src_file, f"{map_dir}{os.sep}{enc_name}-{orig_name}.png", rows=rows, cols=cols, preview_width=preview_width,
+                                   decode_workers=preview_decode_workers)
 
         if delete_source:
             try:
@@ -102,73 +191,113 @@ def mediatranscryption(
             except OSError as e:
                 print(f"删除文件失败: {src_file} - {e}")
 
-    with tqdm(total=total_tasks, desc="Processing", unit="item") as pbar:
-        for root, dirs, files in os.walk(src_dir):
-            if not encrypt:
-                dirs[:] = [d for d in dirs if '@' not in d]
-
-            # 处理目录
-            if root == src_dir:
-                new_root = dst_dir
-                map_root = mapping_root if save_mapping else None
-            else:
-                parent_src = os.path.dirname(root)
-                parent_new = dir_map[parent_src]
-                dir_name = os.path.basename(root)
-                if encrypt:
-                    enc_dir_name = encrypt_folder_name(dir_name, load_key())
+    # 整个遍历共用一个线程池，各目录的文件连续提交，不必等上一个目录处理完
+    max_workers = num_threads or min(32, (os.cpu_count() or 1) + 4)
+    executor = ThreadPoolExecutor(max_workers=max_workers) if use_multithreading else None
+    # 加密/解密进程池：线程提交任务后等待结果，线程数不少于进程数时各进程都能保持忙碌
+    # 工作进程在线程池线程中首次提交时才创建，此时已有多个线程，fork 可能继承被其他线程持有的锁而死锁，
+    # 因此用 forkserver（不支持的平台用 spawn）启动；密钥经 initargs 传入，不依赖继承父进程状态
+    crypt_executor = ProcessPoolExecutor(
+        max_workers=num_threads or os.cpu_count(), mp_context=_crypt_mp_context(),
+        initializer=_init_worker_key, initargs=(key,)
+    ) if use_processes else None
+    # 同时在处理中的任务数上限，避免一次性提交整棵目录树
+    max_in_flight = 4 * max_workers
+    in_flight = set()
+
+    # 已完成但还没有计入进度条的任务数
+    unreported = 0
+
+    def drain(return_when):
+        """等待处理中的任务完成（任一/全部），按完成顺序取回结果，每 PBAR_BATCH 个文件更新一次进度条"""
+        nonlocal in_flight, unreported
+        done, in_flight = wait(in_flight, return_when=return_when)
+        for future in done:
+            future.result()
+        unreported += len(done)
+        if unreported >= PBAR_BATCH or return_when == ALL_COMPLETED:
+            pbar.update(unreported)
+            unreported = 0
+
+    # 不单独预先遍历统计总任务数：从根目录开始，每列举一个目录就把其中的有效子目录和文件数加到进度条总数上
+    with tqdm(total=1, desc="Processing", unit="item") as pbar:
+        try:
+            for root, dirs, files in iter_tree(src_dir):
+                if not encrypt:
+                    dirs[:] = [d for d in dirs if '@' not in d.name]
+
+                # 处理目录
+                if root == src_dir:
+                    new_root = dst_dir
+                    map_root = mapping_root if save_mapping else None
                 else:
-                    enc_dir_name = decrypt_folder_name(dir_name, load_key())
-                new_root = os.path.join(parent_new, enc_dir_name)
+                    parent_src = os.path.dirname(root)
+                    parent_new = dir_map[parent_src]
+                    dir_name = os.path.basename(root)
+                    if encrypt:
+                        enc_dir_name = (incremental and find_existing_dir(parent_new, dir_name)) or \
+                            encrypt_folder_name(dir_name, key)
+                    else:
+                        enc_dir_name = decrypt_folder_name(dir_name, key)
+                    new_root = os.path.join(parent_new, enc_dir_name)
+
+                    if save_mapping:
+                        parent_map_new = mapping_dir_map[parent_src]
+                        # 目录名 = 原名_加密名
+                        map_dir_name = f"{dir_name}@{enc_dir_name}"
+                        map_root = os.path.join(parent_map_new, map_dir_name)
+                    else:
+                        map_root = None
 
+                dir_map[root] = new_root
+                os.makedirs(new_root, exist_ok=True)
                 if save_mapping:
-                    parent_map_new = mapping_dir_map[parent_src]
-                    # 目录名 = 原名_加密名
-                    map_dir_name = f"{dir_name}@{enc_dir_name}"
-                    map_root = os.path.join(parent_map_new, map_dir_name)
-                else:
-                    map_root = None
-
-            dir_map[root] = new_root
-            os.makedirs(new_root, exist_ok=True)
-            if save_mapping:
-                mapping_dir_map[root] = map_root
-                os.makedirs(map_root, exist_ok=True)
-            pbar.update(1)
-
-            # 过滤隐藏文件
-            visible_files = [f for f in files if not f.startswith(".")]
-
-            if use_multithreading and visible_files:
-                # 线程池（可指定线程数）
-                with ThreadPoolExecutor(max_workers=num_threads) as executor:
-                    futures = []
-                    for f in visible_files:
-                        enc_name = string_to_hash(f)
-                        src_file = os.path.join(root, f)
-                        dst_file = os.path.join(new_root, enc_name)
-                        if detached_prevew:
-                            os.makedirs(detached_prevew, exist_ok=True)
-                            map_dir = detached_prevew if save_mapping else None
-                        else:
-                            map_dir = mapping_dir_map.get(root) if save_mapping else None
-                        futures.append(
+                    mapping_dir_map[root] = map_root
+                    os.makedirs(map_root, exist_ok=True)
+                pbar.update(1)
+
+                # 过滤隐藏文件，整个目录的文件名一次算好加密名
+                visible_entries = [f for f in files if not f.name.startswith(".")]
+                visible_files = [f.name for f in visible_entries]
+                enc_names = strings_to_hashes(visible_files)
+                pbar.total += len(dirs) + len(visible_files)
+                # 目标目录前缀每个目录只拼接一次，循环内直接字符串相加
+                new_root_sep = new_root + os.sep
+
+                if executor is not None:
+                    if detached_prevew and visible_files:
+                        os.makedirs(detached_prevew, exist_ok=True)
+                        map_dir = detached_prevew if save_mapping else None
+                    else:
+                        map_dir = mapping_dir_map.get(root) if save_mapping else None
+                    for entry, f, enc_name in zip(visible_entries, visible_files, enc_names):
+                        src_file = entry.path
+                        dst_file = new_root_sep + enc_name
+                        if len(in_flight) >= max_in_flight:
+                            drain(FIRST_COMPLETED)
+                        in_flight.add(
                             executor.submit(
                                 process_file, src_file, dst_file, encrypt, delete_source, map_dir, f, enc_name
                             )
                         )
-                    for future in futures:
-                        future.result()
-                        pbar.update(1)
-            else:
-                # 单线程处理
-                for f in visible_files:
-                    enc_name = string_to_hash(f)
-                    src_file = os.path.join(root, f)
-                    dst_file = os.path.join(new_root, enc_name)
+                else:
+                    # 单线程处理
                     map_dir = mapping_dir_map.get(root) if save_mapping else None
-                    process_file(src_file, dst_file, encrypt, delete_source, map_dir, f, enc_name)
-                    pbar.update(1)
+                    for entry, f, enc_name in zip(visible_entries, visible_files, enc_names):
+                        src_file = entry.path
+                        dst_file = new_root_sep + enc_name
+                        process_file(src_file, dst_file, encrypt, delete_source, map_dir, f, enc_name)
+                        pbar.update(1)
+
+            # 等待剩余任务完成
+            drain(ALL_COMPLETED)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if crypt_executor is not None:
+                crypt_executor.shutdown()
+            # 中途出错时也保存已完成文件的映射
+            write_mapping_logs()
 
 
 if __name__ == "__main__":
@@ -1,19 +1,44 @@
 import hashlib
 
+# 支持的哈希算法及其十六进制摘要的最大长度
+HASH_HEX_LENGTHS = {'sha256': 64, 'blake2b': 128}
 
-def string_to_hash(text: str, length: int = 32) -> str:
+
+def string_to_hash(text: str, length: int = 32, algorithm: str = 'sha256') -> str:
     """
     将任意字符串转换为固定长度的十六进制哈希值
     :param text: 输入字符串
-    :param length: 输出长度(字符数)，最大64(SHA-256产生64字符十六进制)
+    :param length: 输出长度(字符数)，最大64(SHA-256产生64字符十六进制)，BLAKE2b 最大128
+    :param algorithm: 'sha256'（默认，已有的加密文件名、帧前缀都由它生成）或 'blake2b'（更快，结果与 sha256 不同）
     :return: 固定长度的哈希字符串
     """
+    max_length = HASH_HEX_LENGTHS.get(algorithm)
+    if max_length is None:
+        raise ValueError(f"不支持的哈希算法: {algorithm}")
+    if length > max_length:
+        raise ValueError(f"最大支持{max_length}字符({algorithm})")
+
+    data = text.encode('utf-8')
+    if algorithm == 'blake2b':
+        # 直接生成所需长度的摘要（BLAKE2b 的输出长度是参数的一部分，短摘要并非长摘要的截断）
+        return hashlib.blake2b(data, digest_size=max((length + 1) // 2, 1)).hexdigest()[:length]
+    # 一次性构造哈希对象（OpenSSL 实现，支持的 CPU 上使用 SHA 指令扩展），在字节层面截断后再转十六进制
+    return hashlib.sha256(data).digest()[:(length + 1) // 2].hex()[:length]
+
+
+def strings_to_hashes(texts, length: int = 32) -> list:
+    """
+    批量计算多个字符串的 SHA-256 十六进制哈希，结果与逐个调用 string_to_hash(text, length) 相同
+    :param texts: 输入字符串序列（如同一目录下的所有文件名）
+    :param length: 输出长度(字符数)，最大64
+    :return: 与 texts 一一对应的哈希字符串列表
+    """
     if length > 64:
         raise ValueError("最大支持64字符(SHA-256)")
 
-    # 创建SHA-256哈希对象
-    sha256 = hashlib.sha256()
-    # 更新哈希对象(自动处理编码)
-    sha256.update(text.encode('utf-8'))
-    # 获取十六进制摘要并截断
-    return sha256.hexdigest()[:length]
+    sha256 = hashlib.sha256
+    n_bytes = (length + 1) // 2
+    hashes = [sha256(text.encode('utf-8')).digest()[:n_bytes].hex() for text in texts]
+    if length % 2:
+        hashes = [h[:length] for h in hashes]
+    return hashes
@@ -1,18 +1,51 @@
 import os
+import subprocess
 import cv2
 import numpy as np
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor
 
+from folders_files.utiles import iter_tree
+
+# 视频文件扩展名（小写）
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v', '.mpg', '.mpeg', '.ts'})
+# 路径分隔符（Windows 上还包括 /）
+_PATH_SEPS = os.sep + (os.altsep or '')
+# 生成单个视频的预览图时并行定位解码的默认线程数
+PREVIEW_DECODE_WORKERS = 4
+
 
 def is_video_file(file_path):
-    """检查文件是否是视频（基于扩展名）"""
-    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v', '.mpg', '.mpeg', '.ts'}
-    file_ext = os.path.splitext(file_path)[1].lower()  # 获取小写的扩展名
-    return file_ext in video_extensions
+    """检查文件是否是视频（基于扩展名，与 os.path.splitext 取到的扩展名判断结果相同）"""
+    i = file_path.rfind('.')
+    if i < 0 or file_path[i:].lower() not in VIDEO_EXTENSIONS:
+        return False
+    # 与 splitext 一致：文件名开头的点（如 .mp4 隐藏文件）不算扩展名
+    stem = file_path[:i].rstrip('.')
+    return bool(stem) and stem[-1] not in _PATH_SEPS
+
+
+def _read_frames(cap, timestamps):
+    """在 cap 上依次定位并读取一组时间点的帧，读取失败的时间点为 None"""
+    frames = []
+    for ts in timestamps:
+        # 设置到指定时间点
+        cap.set(cv2.CAP_PROP_POS_MSEC, ts * 1000)
+        ret, frame = cap.read()
+        frames.append(frame if ret else None)
+    return frames
+
+
+def _grab_frames(video_path, timestamps):
+    """用独立的 VideoCapture 读取一组时间点的帧（供并行解码的各线程使用）"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return _read_frames(cap, timestamps)
+    finally:
+        cap.release()
 
 
-def generate_video_preview(video_path, output_path, rows=4, cols=4, preview_width=800, fit4169=True):
+def generate_video_preview(video_path, output_path, rows=4, cols=4, preview_width=800, fit4169=True, decode_workers=PREVIEW_DECODE_WORKERS):
     """
     生成视频预览图网格
 
@@ -23,6 +56,7 @@ def generate_video_preview(video_path, output_path, rows=4, cols=4, preview_widt
         cols: 列数
         preview_width: 预览图宽度(高度按比例自动计算)
         fit4169: 是否为横屏显示优化竖屏预览的排布
+        decode_workers: 并行定位解码的线程数，每个线程使用独立的 VideoCapture 负责一段连续的时间点
     """
     if not is_video_file(video_path):
         return
@@ -41,19 +75,23 @@ def generate_video_preview(video_path, output_path, rows=4, cols=4, preview_widt
     intervals = rows * cols
     timestamps = [i * (duration / (intervals + 1)) for i in range(1, intervals + 1)]
 
-    frames = []
-    for ts in timestamps:
-        # 设置到指定时间点
-        cap.set(cv2.CAP_PROP_POS_MSEC, ts * 1000)
-        try:
-            ret, frame = cap.read()
-            if ret:
-                frames.append(frame)
-        except Exception as e:
-            print(f"生成预览图时出错(截取frames出错) {video_path}: {str(e)}")
-            return False
-
-    cap.release()
+    try:
+        if decode_workers > 1 and intervals > 1:
+            cap.release()
+            # 时间点按顺序分成连续的几段，各段的定位互不依赖，可在多个解码器上同时进行
+            step = -(-intervals // decode_workers)
+            groups = [timestamps[i:i + step] for i in range(0, intervals, step)]
+            with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                grabbed = [frame for group in executor.map(_grab_frames, [video_path] * len(groups), groups)
+                           for frame in group]
+        else:
+            grabbed = _read_frames(cap, timestamps)
+    except Exception as e:
+        print(f"生成预览图时出错(截取frames出错) {video_path}: {str(e)}")
+        return False
+    finally:
+        cap.release()
+    frames = [frame for frame in grabbed if frame is not None]
 
     if not frames:
         print(f"无法从视频中提取帧: {video_path}")
@@ -62,38 +100,90 @@ def generate_video_preview(video_path, output_path, rows=4, cols=4, preview_widt
     # 计算每个缩略图的大小
     thumb_height = frames[0].shape[0]
     thumb_width = frames[0].shape[1]
+    # 缩小时用区域插值（按像素面积取平均，缩略图不出现摩尔纹和锯齿），放大时仍用双线性插值
+    interpolation = cv2.INTER_AREA if preview_width / cols < thumb_width else cv2.INTER_LINEAR
 
     # 调整缩略图大小，保持宽高比
     thumb_height = int((preview_width / cols) * (thumb_height / thumb_width))
     thumb_width = int(preview_width / cols)
 
-    # 调整所有帧的大小
-    resized_frames = []
-    for frame in frames:
-        resized = cv2.resize(frame, (thumb_width, thumb_height))
-        resized_frames.append(resized)
-
     if (cols == rows) and (thumb_width < thumb_height) and fit4169 and (cols%2==0):
         cols = cols * 2
         rows = rows // 2
 
-    # 创建网格图像
-    grid = np.zeros((thumb_height * rows, thumb_width * cols, 3), dtype=np.uint8)
+    # 所有帧直接缩放到连续的缩略图数组中（帧数不足时其余位置保持黑色）
+    tiles = np.zeros((rows * cols, thumb_height, thumb_width, 3), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        cv2.resize(frame, (thumb_width, thumb_height), dst=tiles[i], interpolation=interpolation)
 
-    for i, frame in enumerate(resized_frames):
-        row = i // cols
-        col = i % cols
-        y_start = row * thumb_height
-        y_end = y_start + thumb_height
-        x_start = col * thumb_width
-        x_end = x_start + thumb_width
-        grid[y_start:y_end, x_start:x_end] = frame
+    # 创建网格图像：(行, 列, 高, 宽, 3) 交换列和高两个维度后一次性排成网格
+    grid = tiles.reshape(rows, cols, thumb_height, thumb_width, 3).transpose(0, 2, 1, 3, 4).reshape(
+        rows * thumb_height, cols * thumb_width, 3)
 
     # 保存结果
     cv2.imwrite(output_path, grid)
     # print(f"预览图已保存到: {output_path}")
 
 
+def generate_video_preview_ffmpeg(video_path, output_path, rows=4, cols=4, preview_width=800, fit4169=True):
+    """
+    用一次 FFmpeg 调用生成与 generate_video_preview 相同排布的预览图网格：
+    每个截取点作为一个 -ss 快速定位的输入（只从最近的关键帧开始解码），缩放、拼接、网格排布都由 FFmpeg 滤镜完成，
+    不在 Python 中逐帧定位读取和拼图
+    参数同 generate_video_preview
+    """
+    if not is_video_file(video_path):
+        return
+    # 只读取视频信息（不解码）来计算截取时间点和缩略图尺寸
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"无法打开视频文件: {video_path}")
+        return
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+    height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    cap.release()
+    if not fps or not width:
+        print(f"无法从视频中提取帧: {video_path}")
+        return
+    duration = frame_count / fps
+
+    intervals = rows * cols
+    timestamps = [i * (duration / (intervals + 1)) for i in range(1, intervals + 1)]
+
+    # 缩略图尺寸与 generate_video_preview 的计算方式相同
+    thumb_height = int((preview_width / cols) * (height / width))
+    thumb_width = int(preview_width / cols)
+    if (cols == rows) and (thumb_width < thumb_height) and fit4169 and (cols % 2 == 0):
+        cols = cols * 2
+        rows = rows // 2
+
+    inputs = []
+    for ts in timestamps:
+        inputs += ['-ss', f'{ts:.3f}', '-i', video_path]
+    # 每个输入只取定位后的第一帧并缩放（区域插值，与 generate_video_preview 的缩小方式一致），按顺序连接后排成 cols x rows 的网格
+    scaled = ''.join(f'[{i}:v:0]trim=end_frame=1,scale={thumb_width}:{thumb_height}:flags=area,setsar=1[v{i}];'
+                     for i in range(intervals))
+    joined = ''.join(f'[v{i}]' for i in range(intervals))
+    filter_complex = f'{scaled}{joined}concat=n={intervals}:v=1:a=0,tile={cols}x{rows}'
+
+    command = [
+        'ffmpeg',
+        '-y',  # 覆盖输出文件无需确认
+        *inputs,
+        '-filter_complex', filter_complex,
+        '-frames:v', '1',  # 只输出一张网格图
+        output_path,
+        '-hide_banner',  # 隐藏FFmpeg欢迎信息
+        '-loglevel', 'error'  # 只显示错误日志
+    ]
+    result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        print(f"生成预览图时出错 {video_path}: {result.stderr}")
+        return False
+
+
 def generate_previews_for_directory(
         src_dir,
         dst_dir,
@@ -101,7 +191,8 @@ def generate_previews_for_directory(
         cols=4,
         preview_width=800,
         use_multithreading=True,
-        num_threads=None
+        num_threads=None,
+        use_ffmpeg=False
 ):
     """
     遍历目录并在目标目录同文件结构生成视频的预览
@@ -112,32 +203,25 @@ def generate_previews_for_directory(
     :param preview_width: 预览图的像素宽度，高度自动调整
     :param use_multithreading: 是否使用多线程
     :param num_threads: 线程数（None=使用默认线程池线程数）
+    :param use_ffmpeg: 是否用 FFmpeg 一次调用生成每张预览图（generate_video_preview_ffmpeg）
     """
     dir_map = {}
 
-    def count_valid_tasks(src_dir):
-        total_tasks = 0
-        for root, dirs, files in os.walk(src_dir):
-            # 关键修改：原地移除所有含@的目录，阻止os.walk进入这些目录
-            dirs[:] = [d for d in dirs if '@' not in d]
-
-            # 统计当前目录的有效内容（已过滤掉@目录）
-            valid_dirs = len(dirs)  # 因为dirs已经被过滤，直接取长度即可
-            valid_files = len([f for f in files if is_video_file(f)])
-            total_tasks += valid_dirs + valid_files
-
-        return total_tasks
-
-    # 统计总任务数（排除隐藏文件）
-    total_tasks = count_valid_tasks(src_dir)
+    # 多线程处理多个视频时每个视频只用一个解码器，避免线程数成倍增加
+    decode_workers = 1 if use_multithreading else PREVIEW_DECODE_WORKERS
 
     def process_file(src_file, dst_file):
         """单个文件处理函数"""
-        generate_video_preview(src_file, dst_file, rows=rows, cols=cols, preview_width=preview_width)
+        if use_ffmpeg:
+            generate_video_preview_ffmpeg(src_file, dst_file, rows=rows, cols=cols, preview_width=preview_width)
+        else:
+            generate_video_preview(src_file, dst_file, rows=rows, cols=cols, preview_width=preview_width,
+                                   decode_workers=decode_workers)
 
-    with tqdm(total=total_tasks, desc="Processing", unit="item") as pbar:
-        for root, dirs, files in os.walk(src_dir):
-            dirs[:] = [d for d in dirs if '@' not in d]
+    # 不单独预先遍历统计总任务数：从根目录开始，每列举一个目录就把其中的有效子目录和视频数加到进度条总数上
+    with tqdm(total=1, desc="Processing", unit="item") as pbar:
+        for root, dirs, files in iter_tree(src_dir):
+            dirs[:] = [d for d in dirs if '@' not in d.name]
 
             # 处理目录
             if root == src_dir:
@@ -152,18 +236,19 @@ def generate_previews_for_directory(
             os.makedirs(new_root, exist_ok=True)
             pbar.update(1)
 
-            # 过滤隐藏文件
-            visible_files = [f for f in files if not f.startswith(".")]
+            # 过滤隐藏文件，只保留视频（其余文件不生成预览）
+            visible_files = [f for f in files if not f.name.startswith(".") and is_video_file(f.name)]
+            pbar.total += len(dirs) + len(visible_files)
+            # 目标目录前缀每个目录只拼接一次，循环内直接字符串相加
+            new_root_sep = new_root + os.sep
 
             if use_multithreading and visible_files:
                 # 线程池（可指定线程数）
                 with ThreadPoolExecutor(max_workers=num_threads) as executor:
                     futures = []
                     for f in visible_files:
-                        if not is_video_file(f):
-                            continue
-                        src_file = os.path.join(root, f)
-                        dst_file = os.path.join(new_root, f + '.png')
+                        src_file = f.path
+                        dst_file = new_root_sep + f.name + '.png'
                         futures.append(
                             executor.submit(
                                 process_file, src_file, dst_file
@@ -175,8 +260,8 @@ def generate_previews_for_directory(
             else:
                 # 单线程处理
                 for f in visible_files:
-                    src_file = os.path.join(root, f)
-                    dst_file = os.path.join(new_root, f + '.png')
+                    src_file = f.path
+                    dst_file = new_root_sep + f.name + '.png'
                     process_file(src_file, dst_file)
                     pbar.update(1)
 
@@ -1,13 +1,21 @@
+import io
 import os
+import mmap
 import cv2
 import numpy as np
 import random
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from tqdm import tqdm
-from PIL import Image
-from typing import Optional, List, Tuple, Dict, Union
+from typing import Optional, List, Tuple, Dict, Union, Iterable
+
+# 可选：PyTurboJPEG 直接调用 libjpeg-turbo 解码 JPEG，并可在反 DCT 时缩小尺寸
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):  # 未安装 PyTurboJPEG 或找不到 libturbojpeg 动态库
+    _turbojpeg = None
 
 # ================= 配置区域 =================
 
@@ -19,8 +27,31 @@ BRIGHT_COLORS = [
 ]
 
 # 支持的图片扩展名
-VALID_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
-
+VALID_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'})
+
+
+# 可视化结果保存为 JPEG 时的质量
+JPEG_QUALITY = 90
+# 预览缩小倍数 -> cv2.imdecode 读取标志（JPEG 在 DCT 阶段直接缩小，其他格式解码后缩小）
+REDUCED_READ_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# 自动选择进程数时抽查的图片数量，以及判定为大图的文件大小（中位数超过该值时不超额开进程）
+WORKER_PROBE_COUNT = 8
+LARGE_IMAGE_BYTES = 2 * 1024 * 1024
+# 自动选择的进程数上限
+MAX_DRAW_WORKERS = 32
+
+# 单个类别的绘制样式：(BGR 颜色, 标签文字, 文字宽, 文字高)
+ClassStyle = Tuple[Tuple[int, int, int], str, int, int]
+
+# 类别标签文字的字体参数
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_FONT_SCALE = 0.6
+LABEL_THICKNESS = 1
 
 # ===========================================
 
@@ -28,7 +59,9 @@ def draw_dataset_visualization(
         source_dir: str = '',
         class_names: Optional[List[str]] = None,
         sample_nums: int = 100,
-        log_enabled: bool = False
+        log_enabled: bool = False,
+        preview_scale: Optional[int] = None,
+        max_workers: Optional[int] = None
 ) -> None:
     """
     读取数据集的标签和图片，绘制边界框并保存到 testbox 文件夹，用于预览数据质量.
@@ -48,11 +81,26 @@ def draw_dataset_visualization(
     log_enabled : bool, optional
         是否开启日志记录功能。
         默认值为 False。
+    preview_scale : int, optional
+        图片解码时的缩小倍数，可选 1、2、4、8（YOLO 坐标是归一化的，框的位置不受影响）。
+        默认值为 None，表示按原始分辨率解码（与是否安装 PyTurboJPEG 无关）。
+    max_workers : int, optional
+        绘制使用的进程数。默认值为 None，表示根据图片大小自动选择（见 choose_draw_workers）。
 
     Returns
     -------
     None
+
+    Raises
+    ------
+    ValueError
+        preview_scale 不是 None、1、2、4、8 之一，或 max_workers 小于 1 时抛出。
     """
+    if preview_scale is not None and preview_scale not in REDUCED_READ_FLAGS:
+        raise ValueError(f"preview_scale 必须是 {sorted(REDUCED_READ_FLAGS)} 之一，当前值: {preview_scale}")
+    if max_workers is not None and max_workers < 1:
+        raise ValueError(f"max_workers必须大于0，当前值: {max_workers}")
+
     # 路径标准化
     current_dir = os.path.normpath(source_dir) if source_dir else os.getcwd()
     print(f"📂 目标工作目录: {current_dir}")
@@ -91,7 +139,9 @@ def draw_dataset_visualization(
         output_folder,
         class_mapping,  # 传递映射字典
         sample_nums,
-        log_enabled
+        log_enabled,
+        preview_scale,
+        max_workers
     )
 
     print(f"\n✨ 处理完成! 成功生成 {success_count} 张可视化样本，保存在 '{output_folder}'。")
@@ -114,16 +164,32 @@ def setup_logging(directory: str) -> None:
     )
 
 
+# 进程池工作进程中共用的 process_single_pair 参数，由 _init_worker 在进程启动时设置一次
+_worker_ctx: Dict = {}
+
+
+def _init_worker(ctx: Dict) -> None:
+    """进程池初始化函数：每个工作进程只接收一次共用参数（含图片索引），之后的任务不再传递"""
+    _worker_ctx.update(ctx)
+
+
+def _process_in_worker(label_filename: str) -> bool:
+    """在工作进程中用共用参数处理单个标签文件"""
+    return process_single_pair(label_filename, **_worker_ctx)
+
+
 def process_image_batch(
         images_dir: str,
         labels_dir: str,
         output_dir: str,
         class_mapping: Dict[int, str],
         sample_size: int,
-        log_enabled: bool
+        log_enabled: bool,
+        preview_scale: Optional[int] = None,
+        max_workers: Optional[int] = None
 ) -> int:
     """
-    使用多线程批量处理图片和标签.
+    使用多进程批量处理图片和标签.
 
     Parameters
     ----------
@@ -139,74 +205,135 @@ def process_image_batch(
         采样数量。
     log_enabled : bool
         是否记录日志。
+    preview_scale : int, optional
+        图片解码时的缩小倍数，见 read_image。
+    max_workers : int, optional
+        进程数，None 时由 choose_draw_workers 根据图片大小选择。
 
     Returns
     -------
     int
         成功处理的图片数量。
     """
-    # 获取所有标签文件
-    all_label_files = [f for f in os.listdir(labels_dir) if f.endswith(".txt")]
+    # 边列举标签目录边蓄水池采样，不把全部标签文件名放进内存
+    with os.scandir(labels_dir) as entries:
+        label_names = (e.name for e in entries if e.name.endswith(".txt") and e.is_file())
+        target_files, total_labels = sample_label_files(label_names, sample_size)
 
-    if not all_label_files:
+    if not total_labels:
         if log_enabled: logging.warning(f"⚠️ 在 {labels_dir} 中未找到 .txt 标签文件")
         return 0
 
-    # 随机采样
-    target_files = sample_label_files(all_label_files, sample_size)
-
     if log_enabled:
-        logging.info(f"📌 计划处理 {len(target_files)} 张图片 (总标签数: {len(all_label_files)})")
+        logging.info(f"📌 计划处理 {len(target_files)} 张图片 (总标签数: {total_labels})")
+
+    # 一次列举图片目录建立 {不含扩展名的文件名: 图片文件名} 索引，代替每个标签逐个扩展名 os.path.exists
+    # 只保留采样到的标签对应的图片，减少发送给各进程的数据量
+    image_index = build_image_index(images_dir)
+    target_bases = (os.path.splitext(f)[0] for f in target_files)
+    image_index = {base: image_index[base] for base in target_bases if base in image_index}
 
-    # 多线程处理
-    max_workers = min(32, (os.cpu_count() or 1) * 2)
+    # 多进程处理：解码、绘制、编码都是 CPU 密集的工作
+    if max_workers is None:
+        max_workers = choose_draw_workers(images_dir, image_index.values())
+    if log_enabled:
+        logging.info(f"⚙️ 绘制进程数: {max_workers}")
+
+    # 各任务共用的参数只在工作进程启动时传递一次，之后每个任务只需传递标签文件名
+    # 已知类别的颜色、标签文字和文字尺寸提前生成一张表，绘制时按类别 ID 直接取用
+    worker_ctx = dict(
+        images_dir=images_dir,
+        labels_dir=labels_dir,
+        output_dir=output_dir,
+        class_mapping=class_mapping,
+        class_table=build_class_table(class_mapping),
+        log_enabled=log_enabled,
+        image_index=image_index,
+        preview_scale=preview_scale
+    )
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        process_func = partial(
-            process_single_pair,
-            images_dir=images_dir,
-            labels_dir=labels_dir,
-            output_dir=output_dir,
-            class_mapping=class_mapping,
-            log_enabled=log_enabled
-        )
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(worker_ctx,)) as executor:
 
-        futures = {executor.submit(process_func, f): f for f in target_files}
+        # 任务分块发送给各进程，减少进程间通信次数
+        chunksize = max(1, len(target_files) // (max_workers * 4))
+        results = executor.map(_process_in_worker, target_files, chunksize=chunksize)
 
         success_count = 0
-        for future in tqdm(as_completed(futures), total=len(target_files), desc="绘制进度"):
-            if future.result():
+        for ok in tqdm(results, total=len(target_files), desc="绘制进度"):
+            if ok:
                 success_count += 1
 
     return success_count
 
 
-def sample_label_files(file_list: List[str], sample_size: int) -> List[str]:
+def choose_draw_workers(images_dir: str, image_filenames: Iterable[str]) -> int:
     """
-    从文件列表中随机采样.
+    根据抽查的图片大小选择绘制进程数.
+
+    小图的耗时主要在熵解码和文件读写上，每核两个进程可以填补 I/O 等待；
+    大图的解码和编码受内存带宽限制，超额开进程反而更慢，此时每核一个进程。
 
     Parameters
     ----------
-    file_list : List[str]
-        原始文件列表。
+    images_dir : str
+        图片目录。
+    image_filenames : Iterable[str]
+        待处理的图片文件名，只抽查前 WORKER_PROBE_COUNT 个。
+
+    Returns
+    -------
+    int
+        进程数，不超过 MAX_DRAW_WORKERS。
+    """
+    cpu_count = os.cpu_count() or 1
+    sizes = []
+    for name in image_filenames:
+        if len(sizes) >= WORKER_PROBE_COUNT:
+            break
+        try:
+            sizes.append(os.stat(os.path.join(images_dir, name)).st_size)
+        except OSError:
+            continue
+
+    if sizes and float(np.median(sizes)) > LARGE_IMAGE_BYTES:
+        return min(MAX_DRAW_WORKERS, cpu_count)
+    return min(MAX_DRAW_WORKERS, cpu_count * 2)
+
+
+def sample_label_files(file_iter: Iterable[str], sample_size: int) -> Tuple[List[str], int]:
+    """
+    从文件名流中蓄水池采样（Algorithm R），只需遍历一次，内存只占 sample_size 个文件名.
+
+    Parameters
+    ----------
+    file_iter : Iterable[str]
+        文件名迭代器（可以是 os.scandir 的生成器）。
     sample_size : int
-        需要的样本数量。
+        需要的样本数量，小于等于 0 时按 1 处理；超过总数时返回全部文件。
 
     Returns
     -------
-    List[str]
-        采样后的文件列表。
+    Tuple[List[str], int]
+        采样后的文件列表，以及遍历到的文件总数。
     """
     if sample_size <= 0:
         sample_size = 1
 
-    if sample_size >= len(file_list):
-        return file_list
-
-    rng = random.SystemRandom() if hasattr(random, 'SystemRandom') else random
-    return rng.sample(file_list, sample_size)
+    # 普通伪随机数即可，预览采样不需要 SystemRandom（每次取数都是一次系统调用）
+    rng = random.Random()
+    sample = []
+    total = 0
+    for total, name in enumerate(file_iter, 1):
+        if total <= sample_size:
+            sample.append(name)
+        else:
+            j = rng.randrange(total)
+            if j < sample_size:
+                sample[j] = name
+    return sample, total
 
 
+@lru_cache(maxsize=None)
 def get_color(class_id: int) -> Tuple[int, int, int]:
     """
     根据类别ID获取对应的颜色.
@@ -224,8 +351,106 @@ def get_color(class_id: int) -> Tuple[int, int, int]:
     if 0 <= class_id < len(BRIGHT_COLORS):
         return BRIGHT_COLORS[class_id]
 
-    random.seed(class_id)
-    return (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
+    # 以类别ID为种子的独立随机数生成器：颜色与原先 random.seed(class_id) 的结果相同，且不重置全局随机状态
+    rng = random.Random(class_id)
+    return (rng.randint(50, 255), rng.randint(50, 255), rng.randint(50, 255))
+
+
+def parse_yolo_labels(text: str) -> np.ndarray:
+    """
+    解析 YOLO 标签文本为 (N, 5) 数组：类别ID, cx, cy, w, h.
+
+    正常的标签由 np.loadtxt 一次解析（每行只取前5列，分割标签的多余列忽略）；
+    含有列数不足或非数字的行时改为逐行解析并跳过这些行。
+
+    Parameters
+    ----------
+    text : str
+        标签文件内容。
+
+    Returns
+    -------
+    np.ndarray
+        float64 数组，没有有效框时为 (0, 5)。
+    """
+    if not text.strip():
+        return np.empty((0, 5))
+    try:
+        return np.loadtxt(io.StringIO(text), usecols=range(5), ndmin=2)
+    except ValueError:
+        rows = []
+        for line in text.splitlines():
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            try:
+                rows.append((int(parts[0]), *map(float, parts[1:5])))
+            except ValueError:
+                continue
+        return np.array(rows, dtype=np.float64).reshape(-1, 5)
+
+
+def read_image(image_path: str, scale: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    读取图片为 BGR 数组.
+
+    安装了 PyTurboJPEG 时 JPEG 由 libjpeg-turbo 直接解码；其他格式或未安装时使用 cv2.imdecode（支持中文路径）。
+    两条路径的输出尺寸相同：默认原始分辨率，指定 scale 时按该倍数缩小解码
+    （JPEG 在 DCT 阶段缩小，几乎不增加开销）。
+    文件通过 mmap 只读映射后交给解码器。
+
+    Parameters
+    ----------
+    image_path : str
+        图片文件路径。
+    scale : int, optional
+        缩小倍数，取值为 REDUCED_READ_FLAGS 的键；None 时按原始分辨率解码。
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        BGR 图像数组，无法解码时返回 None。
+    """
+    with open(image_path, 'rb') as fh:
+        if fh.seek(0, os.SEEK_END) == 0:
+            return None  # 空文件无法映射，也无法解码
+        # 映射文件而不是读入 bytes，解码器直接读取页缓存，省去一次整文件拷贝
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with mm:
+        if hasattr(mm, 'madvise'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)  # 顺序读取，让内核提前预读
+        buf = np.frombuffer(mm, dtype=np.uint8)
+        try:
+            if _turbojpeg is not None and image_path.lower().endswith(('.jpg', '.jpeg')):
+                scaling_factor = (1, scale) if scale and scale > 1 else None
+                return _turbojpeg.decode(buf, pixel_format=TJPF_BGR, scaling_factor=scaling_factor)
+            return cv2.imdecode(buf, REDUCED_READ_FLAGS[scale or 1])
+        finally:
+            del buf  # 关闭映射前释放对它的引用
+
+
+def build_image_index(images_dir: str) -> Dict[str, str]:
+    """
+    一次 os.scandir 列举图片目录，建立不含扩展名的文件名到图片文件名的索引.
+
+    Parameters
+    ----------
+    images_dir : str
+        图片目录。
+
+    Returns
+    -------
+    Dict[str, str]
+        {不含扩展名的文件名: 图片文件名}，扩展名不区分大小写。
+    """
+    image_index = {}
+    with os.scandir(images_dir) as entries:
+        for entry in entries:
+            base_name, ext = os.path.splitext(entry.name)
+            if ext.lower() in VALID_IMAGE_EXTENSIONS and entry.is_file():
+                image_index.setdefault(base_name, entry.name)
+    return image_index
 
 
 def find_image_file(base_name: str, images_dir: str) -> Optional[str]:
@@ -257,7 +482,10 @@ def process_single_pair(
         labels_dir: str,
         output_dir: str,
         class_mapping: Dict[int, str],
-        log_enabled: bool
+        log_enabled: bool,
+        image_index: Optional[Dict[str, str]] = None,
+        preview_scale: Optional[int] = None,
+        class_table: Optional[Tuple[ClassStyle, ...]] = None
 ) -> bool:
     """
     处理单对图片和标签文件：读取、绘制、保存.
@@ -276,6 +504,12 @@ def process_single_pair(
         类别映射字典。
     log_enabled : bool
         是否记录日志。
+    image_index : Dict[str, str], optional
+        build_image_index 生成的图片索引；不提供时逐个扩展名查找图片文件。
+    preview_scale : int, optional
+        图片解码时的缩小倍数，见 read_image。
+    class_table : Tuple[ClassStyle, ...], optional
+        build_class_table 生成的类别样式表；表外的类别 ID 临时生成样式。
 
     Returns
     -------
@@ -286,7 +520,10 @@ def process_single_pair(
         base_name = os.path.splitext(label_filename)[0]
 
         # 1. 寻找对应的图片文件
-        image_filename = find_image_file(base_name, images_dir)
+        if image_index is not None:
+            image_filename = image_index.get(base_name)
+        else:
+            image_filename = find_image_file(base_name, images_dir)
         if not image_filename:
             return False
 
@@ -294,46 +531,75 @@ def process_single_pair(
         label_path = os.path.join(labels_dir, label_filename)
         output_path = os.path.join(output_dir, image_filename)
 
-        # 2. 读取图片
-        img_array = np.fromfile(image_path, dtype=np.uint8)
-        image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+        # 2. 先读取标签，一次解析所有框为 (N, 5) 数组
+        with open(label_path, 'r', encoding='utf-8') as f:
+            boxes = parse_yolo_labels(f.read())
+
+        # 空标签（负样本）没有可绘制的框，不必解码图片
+        if len(boxes) == 0:
+            return True  # 空标签也被视为处理完成
+
+        # 3. 读取图片
+        image = read_image(image_path, preview_scale)
         if image is None:
             return False
 
         height, width = image.shape[:2]
 
-        # 3. 读取标签
-        with open(label_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        # 4. 批量换算所有框的像素坐标，再逐个绘制
+        class_ids = boxes[:, 0].astype(int).tolist()
+        pixel_boxes = yolo_to_pixel_boxes(boxes[:, 1:5], width, height).tolist()
+
+        # 按类别 ID 查表取样式，表外的类别（如未提供名称的 ID）每张图只生成一次
+        if class_table is None:
+            class_table = ()
+        extra_styles = {}
+        for class_id, box in zip(class_ids, pixel_boxes):
+            if 0 <= class_id < len(class_table):
+                style = class_table[class_id]
+            else:
+                style = extra_styles.get(class_id)
+                if style is None:
+                    style = extra_styles[class_id] = class_style(class_id, class_mapping)
+            draw_styled_box(image, style, *box)
+
+        # 5. 保存结果：直接编码 BGR 图像，编码结果用 tofile 写出以支持中文路径
+        ext = os.path.splitext(output_path)[1]
+        # JPEG 质量参数只对 JPEG 有效，其他格式传入会让 OpenCV 每张图打印一次警告
+        params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY] if ext.lower() in ('.jpg', '.jpeg') else ()
+        ok, encoded = cv2.imencode(ext, image, params)
+        if not ok:
+            return False
+        encoded.tofile(output_path)
+        return True
 
-        # 4. 绘制所有框
-        has_valid_box = False
-        for line in lines:
-            parts = line.strip().split()
-            if len(parts) < 5:
-                continue
+    except Exception as e:
+        if log_enabled: logging.error(f"❌ 处理异常 {label_filename}: {str(e)}")
+        return False
 
-            try:
-                class_id = int(parts[0])
-                cx, cy, w, h = map(float, parts[1:5])
 
-                # 传入 class_mapping
-                draw_box_on_image(image, class_id, cx, cy, w, h, width, height, class_mapping)
-                has_valid_box = True
-            except ValueError:
-                continue
+def yolo_to_pixel_boxes(coords: np.ndarray, img_width: int, img_height: int) -> np.ndarray:
+    """
+    把一张图片的所有归一化 YOLO 框一次换算为裁剪到图像范围内的像素坐标.
 
-        # 5. 保存结果
-        if has_valid_box:
-            img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            Image.fromarray(img_rgb).save(output_path)
-            return True
-        else:
-            return True  # 空标签也被视为处理完成
+    Parameters
+    ----------
+    coords : np.ndarray
+        形状为 (N, 4) 的数组，每行为归一化的 cx, cy, w, h。
+    img_width, img_height : int
+        图像的像素宽高。
 
-    except Exception as e:
-        if log_enabled: logging.error(f"❌ 处理异常 {label_filename}: {str(e)}")
-        return False
+    Returns
+    -------
+    np.ndarray
+        形状为 (N, 4) 的整数数组，每行为 x_min, y_min, x_max, y_max。
+    """
+    size = np.array([img_width, img_height])
+    centers, half_sizes = coords[:, :2], coords[:, 2:4] / 2
+    # 与逐个框 int() 截断、再 max(0, ...) / min(宽高, ...) 的结果一致
+    mins = np.maximum(((centers - half_sizes) * size).astype(int), 0)
+    maxs = np.minimum(((centers + half_sizes) * size).astype(int), size)
+    return np.hstack((mins, maxs))
 
 
 def draw_box_on_image(
@@ -368,21 +634,65 @@ def draw_box_on_image(
     x_min, y_min = max(0, x_min), max(0, y_min)
     x_max, y_max = min(img_width, x_max), min(img_height, y_max)
 
-    color = get_color(class_id)
+    draw_labeled_box(image, class_id, x_min, y_min, x_max, y_max, class_mapping)
 
-    # 1. 绘制矩形框
-    cv2.rectangle(image, (x_min, y_min), (x_max, y_max), color, 2)
 
-    # 2. 获取标签文字 (优先使用映射表中的名字)
+@lru_cache(maxsize=256)
+def _text_size(label_text: str, font: int, font_scale: float, thickness: int) -> Tuple[Tuple[int, int], int]:
+    """cv2.getTextSize 的缓存版本：同一类别的标签文字尺寸只计算一次"""
+    return cv2.getTextSize(label_text, font, font_scale, thickness)
+
+
+def label_text_for(class_id: int, class_mapping: Dict[int, str]) -> str:
+    """类别标签文字 (优先使用映射表中的名字)"""
     class_name = class_mapping.get(class_id, f"Class {class_id}")
-    label_text = f"{class_name} {class_id}"
+    return f"{class_name} {class_id}"
+
+
+def class_style(class_id: int, class_mapping: Dict[int, str]) -> ClassStyle:
+    """单个类别的绘制样式：(颜色, 标签文字, 文字宽, 文字高)"""
+    label_text = label_text_for(class_id, class_mapping)
+    (text_w, text_h), _ = _text_size(label_text, LABEL_FONT, LABEL_FONT_SCALE, LABEL_THICKNESS)
+    return get_color(class_id), label_text, text_w, text_h
+
+
+def build_class_table(class_mapping: Dict[int, str]) -> Tuple[ClassStyle, ...]:
+    """
+    为 0 到映射表中最大 ID 的每个类别预先生成绘制样式.
+
+    Parameters
+    ----------
+    class_mapping : Dict[int, str]
+        类别 ID 到名称的映射字典。
+
+    Returns
+    -------
+    Tuple[ClassStyle, ...]
+        以类别 ID 为下标的样式表；映射表为空时为空元组。
+    """
+    max_id = max(class_mapping, default=-1)
+    return tuple(class_style(class_id, class_mapping) for class_id in range(max_id + 1))
+
+
+def draw_styled_box(image: np.ndarray, style: ClassStyle, x_min: int, y_min: int, x_max: int, y_max: int) -> None:
+    """
+    按像素坐标和预先生成的类别样式在图像上绘制边界框和类别标签.
 
-    # 3. 绘制文字背景和文字
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    font_scale = 0.6
-    thickness = 1
-    (text_w, text_h), baseline = cv2.getTextSize(label_text, font, font_scale, thickness)
+    Parameters
+    ----------
+    image : np.ndarray
+        OpenCV 图像对象 (原地修改)。
+    style : ClassStyle
+        class_style 生成的 (颜色, 标签文字, 文字宽, 文字高)。
+    x_min, y_min, x_max, y_max : int
+        已裁剪到图像范围内的像素坐标。
+    """
+    color, label_text, text_w, text_h = style
+
+    # 1. 绘制矩形框
+    cv2.rectangle(image, (x_min, y_min), (x_max, y_max), color, 2)
 
+    # 2. 绘制文字背景和文字
     if y_min - text_h - 5 < 0:
         text_origin_y = y_min + text_h + 5
         rect_y1 = y_min
@@ -393,7 +703,31 @@ def draw_box_on_image(
         rect_y2 = y_min
 
     cv2.rectangle(image, (x_min, rect_y1), (x_min + text_w, rect_y2), color, -1)
-    cv2.putText(image, label_text, (x_min, text_origin_y), font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
+    cv2.putText(image, label_text, (x_min, text_origin_y), LABEL_FONT, LABEL_FONT_SCALE, (255, 255, 255),
+                LABEL_THICKNESS, cv2.LINE_AA)
+
+
+def draw_labeled_box(
+        image: np.ndarray,
+        class_id: int,
+        x_min: int, y_min: int, x_max: int, y_max: int,
+        class_mapping: Dict[int, str]
+) -> None:
+    """
+    按像素坐标在图像上绘制边界框和类别标签.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        OpenCV 图像对象 (原地修改)。
+    class_id : int
+        类别 ID。
+    x_min, y_min, x_max, y_max : int
+        已裁剪到图像范围内的像素坐标。
+    class_mapping : Dict[int, str]
+        类别 ID 到名称的映射字典。
+    """
+    draw_styled_box(image, class_style(class_id, class_mapping), x_min, y_min, x_max, y_max)
 
 
 if __name__ == "__main__":
@@ -12,8 +12,63 @@ Step 2
 """
 
 import os
-import shutil
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from folders_files.utiles import move_file
+
+# 批量删除/移动不匹配文件时的线程数（各文件的操作互不依赖，耗时主要在系统调用等待上）
+FILE_OP_WORKERS = 8
+
+
+def _scan_stems(directory, suffix):
+    """一次 os.scandir 列出目录中指定后缀（不区分大小写）的文件：{不含扩展名的文件名: 完整路径}"""
+    with os.scandir(directory) as entries:
+        return {e.name[:-len(suffix)]: e.path for e in entries if e.name.lower().endswith(suffix)}
+
+
+def _remove_files(paths):
+    """多线程删除文件，返回成功删除的数量"""
+    def remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError as e:
+            print(f"   删除失败: {os.path.basename(path)} - {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=FILE_OP_WORKERS) as executor:
+        return sum(executor.map(remove, paths))
+
+
+def _move_files(pairs):
+    """多线程移动文件 [(源路径, 目标路径), ...]，返回成功移动的数量"""
+    def move(pair):
+        src, dst = pair
+        try:
+            move_file(src, dst)
+            return True
+        except Exception as e:
+            print(f"   移动失败: {os.path.basename(src)} - {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=FILE_OP_WORKERS) as executor:
+        return sum(executor.map(move, pairs))
+
+
+def _touch_files(paths):
+    """多线程创建空文件（已存在的文件不截断），返回成功创建的路径列表，顺序与输入一致"""
+    def touch(path):
+        try:
+            # 不写入内容，直接 os.open/os.close，省去 Python 文件对象的创建
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o644))
+            return path
+        except OSError as e:
+            print(f"   ❌ 创建失败: {os.path.basename(path)} - {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=FILE_OP_WORKERS) as executor:
+        return [path for path in executor.map(touch, paths) if path is not None]
 
 
 def check_mismatches(source_dir, mode='sep'):
@@ -66,18 +121,25 @@ def check_mismatches(source_dir, mode='sep'):
 
     # 获取文件列表 (仅根据文件名匹配，忽略大小写)
     # 假设图片为 .jpg, 标签为 .txt (基于原代码逻辑)
-    image_files = {os.path.splitext(f)[0] for f in os.listdir(images_dir)
-                   if f.lower().endswith('.jpg')}
-    label_files = {os.path.splitext(f)[0] for f in os.listdir(labels_dir)
-                   if f.lower().endswith('.txt')}
+    # 以文件名（不含扩展名）为键保存完整路径，删除/移动时直接使用，扩展名大小写也保持原样
+    # 先列出标签，再流式遍历图片目录：匹配上的标签直接从字典中弹出，
+    # 遍历结束后剩下的就是没有图片的标签，不再为图片目录另建一份完整的集合
+    labels_without_images = _scan_stems(labels_dir, '.txt')
+    label_count = len(labels_without_images)
+    images_without_labels = {}
+    image_count = 0
+    with os.scandir(images_dir) as entries:
+        for e in entries:
+            if not e.name.lower().endswith('.jpg'):
+                continue
+            image_count += 1
+            stem = e.name[:-4]
+            if labels_without_images.pop(stem, None) is None:
+                images_without_labels[stem] = e.path
 
     print(f"📊 统计信息:")
-    print(f"   - 图片文件数量: {len(image_files)}")
-    print(f"   - 标签文件数量: {len(label_files)}")
-
-    # 计算差集
-    images_without_labels = image_files - label_files
-    labels_without_images = label_files - image_files
+    print(f"   - 图片文件数量: {image_count}")
+    print(f"   - 标签文件数量: {label_count}")
 
     # -------------------------------------------------
     # 结果展示
@@ -114,7 +176,7 @@ def check_mismatches(source_dir, mode='sep'):
     # -------------------------------------------------
     if not has_mismatch:
         print("\n🎉 完美! 数据集一一对应，无需处理。")
-        return images_without_labels, labels_without_images
+        return set(), set()
 
     print("\n" + "=" * 50)
     print("⚠️  发现不匹配文件，请选择操作:")
@@ -126,22 +188,8 @@ def check_mismatches(source_dir, mode='sep'):
 
     if choice == 'd':
         print("\n🗑️  正在删除文件...")
-        cnt = 0
-        # 删除图片
-        for file in images_without_labels:
-            try:
-                os.remove(os.path.join(images_dir, f"{file}.jpg"))
-                cnt += 1
-            except OSError as e:
-                print(f"   删除失败: {file}.jpg - {e}")
-
-        # 删除标签
-        for file in labels_without_images:
-            try:
-                os.remove(os.path.join(labels_dir, f"{file}.txt"))
-                cnt += 1
-            except OSError as e:
-                print(f"   删除失败: {file}.txt - {e}")
+        # 删除图片和标签
+        cnt = _remove_files(list(images_without_labels.values()) + list(labels_without_images.values()))
         print(f"✨ 已删除 {cnt} 个文件。")
 
     elif choice == 'm':
@@ -161,32 +209,16 @@ def check_mismatches(source_dir, mode='sep'):
             os.makedirs(target_no_images)
             print(f"   创建文件夹: {target_no_images}")
 
-        cnt = 0
-        # 移动图片
-        for file in images_without_labels:
-            src = os.path.join(images_dir, f"{file}.jpg")
-            dst = os.path.join(target_no_labels, f"{file}.jpg")
-            try:
-                shutil.move(src, dst)
-                cnt += 1
-            except Exception as e:
-                print(f"   移动失败: {file}.jpg - {e}")
-
-        # 移动标签
-        for file in labels_without_images:
-            src = os.path.join(labels_dir, f"{file}.txt")
-            dst = os.path.join(target_no_images, f"{file}.txt")
-            try:
-                shutil.move(src, dst)
-                cnt += 1
-            except Exception as e:
-                print(f"   移动失败: {file}.txt - {e}")
+        # 移动图片和标签
+        cnt = _move_files(
+            [(src, os.path.join(target_no_labels, os.path.basename(src))) for src in images_without_labels.values()] +
+            [(src, os.path.join(target_no_images, os.path.basename(src))) for src in labels_without_images.values()])
         print(f"✨ 已移动 {cnt} 个文件到备份目录。")
 
     else:
         print("\n🛑 操作已取消，未修改任何文件。")
 
-    return images_without_labels, labels_without_images
+    return set(images_without_labels), set(labels_without_images)
 
 
 import os
@@ -240,14 +272,13 @@ def generate_empty_labels_for_negative_samples(source_dir):
     valid_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.tif')
 
     # 获取所有图片文件（不带扩展名）
-    image_files = [f for f in os.listdir(images_dir) if f.lower().endswith(valid_extensions)]
-    image_names = {os.path.splitext(f)[0] for f in image_files}
+    with os.scandir(images_dir) as entries:
+        image_names = {os.path.splitext(e.name)[0] for e in entries if e.name.lower().endswith(valid_extensions)}
 
     # 获取现有标签文件（如果不创建目录，则获取现有；否则为空）
     existing_labels = set()
     if not need_create_label_dir:
-        existing_labels = {os.path.splitext(f)[0] for f in os.listdir(labels_dir)
-                           if f.lower().endswith('.txt')}
+        existing_labels = _scan_stems(labels_dir, '.txt').keys()
 
     # 计算需要生成的标签
     # 逻辑：有图片 但 没有标签 的文件
@@ -290,17 +321,8 @@ def generate_empty_labels_for_negative_samples(source_dir):
                 return []
 
         # 2. 批量创建空文件
-        success_count = 0
-        for name in missing_labels:
-            txt_path = os.path.join(labels_dir, f"{name}.txt")
-            try:
-                # 创建空文件
-                with open(txt_path, 'w') as f:
-                    pass
-                created_files.append(txt_path)
-                success_count += 1
-            except Exception as e:
-                print(f"   ❌ 创建失败: {name}.txt - {e}")
+        created_files = _touch_files([os.path.join(labels_dir, f"{name}.txt") for name in missing_labels])
+        success_count = len(created_files)
 
         print(f"\n✨ 处理完成!")
         print(f"   成功生成: {success_count} 个空标签文件")